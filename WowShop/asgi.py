@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Checkout/verify are async views; under an ASGI server (e.g.
+``uvicorn WowShop.asgi:application --workers 4``) payments waiting on the
+gateway share each worker's event loop instead of pinning a worker each.
 """
 
 import os
@@ -14,3 +18,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WowShop.settings')
 
 application = get_asgi_application()
+
+from WowShop.schedulers import start_schedulers  # noqa: E402
+
+start_schedulers()
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+
+
+def start_schedulers():
+    """
+    کارهای دوره‌ای پس‌زمینه (thread داخل process) که فاصله اجرایشان در settings تنظیم
+    شده است. فقط از wsgi.py/asgi.py صدا زده می‌شود تا migrate، shell و دیگر دستورات
+    مدیریتی thread نسازند؛ بدون سرور از دستورات expire_offers، release_reservations و
+    reconcile_payments با --interval استفاده کنید.
+    """
+    if settings.OFFER_EXPIRY_INTERVAL:
+        from core.reservations import start_expiry_scheduler
+        start_expiry_scheduler(settings.OFFER_EXPIRY_INTERVAL,
+                               timedelta(minutes=settings.OFFER_EXPIRY_MINUTES))
+
+    if settings.STOCK_RESERVATION_INTERVAL:
+        from shop.inventory import start_release_scheduler
+        start_release_scheduler(settings.STOCK_RESERVATION_INTERVAL)
+
+    if settings.PAYMENT_RECONCILE_INTERVAL:
+        from shop.reconciliation import start_reconcile_scheduler
+        start_reconcile_scheduler(settings.PAYMENT_RECONCILE_INTERVAL,
+                                  timedelta(minutes=settings.PAYMENT_RECONCILE_MINUTES))
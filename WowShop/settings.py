@@ -41,7 +41,8 @@ INSTALLED_APPS = [
     'account',
     'core',
     'shop',
-    'dashboard'
+    'dashboard',
+    'api',
 
 ]
 
@@ -53,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'shop.middleware.CartCookieMiddleware',
 ]
 
 ROOT_URLCONF = 'WowShop.urls'
@@ -68,6 +70,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'shop.context_processors.cart',
             ],
         },
     },
@@ -86,6 +89,32 @@ DATABASES = {
     }
 }
 
+# جستجوی محصولات (shop.search)؛ برای Postgres می‌توان backend مبتنی بر tsvector نوشت
+PRODUCT_SEARCH_BACKEND = 'shop.search.SQLiteFTSBackend'
+
+
+# API فقط خواندنی (api/v1)؛ فقط خروجی JSON و بدون احراز هویت
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.AllowAny'],
+    'UNAUTHENTICATED_USER': None,
+}
+# سقف زمان نگهداری پاسخ‌های API در cache (ثانیه)؛ invalidation اصلی با signal هاست
+API_CACHE_TIMEOUT = 5 * 60
+
+
+# Cache
+# fragment های صفحه اصلی با signal ها invalidate می‌شوند؛ در production باید cache
+# مشترک بین worker ها باشد (مثلاً Redis یا Memcached)، نه LocMem.
+# با LocMem هر worker نسخه‌ها را جدا نگه می‌دارد، پس fragment ها حداکثر این مدت (ثانیه) کهنه می‌مانند
+FRAGMENT_CACHE_TIMEOUT = 60
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,6 +157,47 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = 'media/'
 
+# ارسال فایل‌های مدرک توسط وب‌سرور: None، 'x-accel-redirect' (nginx) یا 'x-sendfile'
+PROOF_MEDIA_OFFLOAD = None
+# مسیر internal در nginx که به MEDIA_ROOT اشاره می‌کند
+PROOF_MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Offer های pending بعد از این مدت منقضی می‌شوند و گلدشان به سفارش برمی‌گردد
+OFFER_EXPIRY_MINUTES = 60
+# برای اجرای sweeper داخل process سرور (wsgi/asgi)، فاصله اجرا (ثانیه) را تنظیم کنید
+OFFER_EXPIRY_INTERVAL = None
+
+# رزرو موجودی محصولات در checkout تا این مدت برای پرداخت نگه داشته می‌شود
+STOCK_RESERVATION_MINUTES = 15
+# برای آزاد کردن رزروهای منقضی داخل process سرور (wsgi/asgi)، فاصله اجرا (ثانیه) را تنظیم کنید
+STOCK_RESERVATION_INTERVAL = None
+
+# درگاه زرین‌پال (REST v4)؛ برای تست آفلاین: python manage.py zarinpal_stub و
+# ZARINPAL_API_URL = 'http://127.0.0.1:8765' و ZARINPAL_STARTPAY_URL = 'http://127.0.0.1:8765/pg/StartPay/'
+ZARINPAL_MERCHANT_ID = 'XXXXXXXX-XXXX-XXXX-XXXX-XXXXXXXXXXXX'
+ZARINPAL_API_URL = 'https://sandbox.zarinpal.com'
+ZARINPAL_STARTPAY_URL = 'https://sandbox.zarinpal.com/pg/StartPay/'
+# timeout (اتصال، خواندن) به ثانیه؛ هیچ worker بیش از این منتظر درگاه نمی‌ماند
+ZARINPAL_TIMEOUT = (3.05, 10)
+# تعداد تکرار روی خطای اتصال (و برای verify روی timeout خواندن و 5xx)
+ZARINPAL_RETRIES = 2
+# حداکثر اتصال keep-alive باز به درگاه برای هر process
+ZARINPAL_POOL_SIZE = 10
+
+# پرداخت‌های pending قدیمی‌تر از این مدت با verify درگاه تعیین وضعیت می‌شوند
+PAYMENT_RECONCILE_MINUTES = 30
+# برای اجرای reconcile داخل process سرور (wsgi/asgi)، فاصله اجرا (ثانیه) را تنظیم کنید
+PAYMENT_RECONCILE_INTERVAL = None
+
+# کلید idempotency فرم checkout تا این مدت (ساعت) نتیجه‌اش را نگه می‌دارد
+CHECKOUT_KEY_TTL_HOURS = 24
+# ارسال تکراری هم‌زمان حداکثر این مدت (ثانیه) منتظر نتیجه درخواست اول می‌ماند
+CHECKOUT_KEY_WAIT = 10
+
+# شماره فاکتورها از این عدد شروع می‌شود؛ هر process هر بار این تعداد شماره را یک‌جا رزرو می‌کند
+INVOICE_NUMBER_START = 1001
+INVOICE_NUMBER_BLOCK = 20
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
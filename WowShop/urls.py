@@ -29,6 +29,7 @@ urlpatterns = [
     path('', include('core.urls', namespace='core')),
     path('shop/', include('shop.urls', namespace='shop')),
     path('dashboard/', include('dashboard.urls')),
+    path('api/v1/', include('api.urls', namespace='api-v1')),
 
 ]
 
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WowShop.settings')
 
 application = get_wsgi_application()
+
+from WowShop.schedulers import start_schedulers  # noqa: E402
+
+start_schedulers()
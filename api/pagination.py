@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CatalogCursorPagination(CursorPagination):
+    """
+    صفحه‌بندی cursor (بدون COUNT و OFFSET)؛ ترتیب روی هر viewset با ordering
+    تعیین می‌شود و ?limit= اندازه صفحه را تا سقف max_page_size تغییر می‌دهد.
+    """
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'ordering', self.ordering)
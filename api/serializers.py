@@ -0,0 +1,70 @@
+from rest_framework import serializers
+
+from core import models as core_models
+from shop import models as shop_models
+
+
+class SparseFieldsSerializer(serializers.ModelSerializer):
+    """
+    ?fields=name,price فقط همان فیلدها را برمی‌گرداند. بدون آن default_fields
+    (نسخه فشرده، بدون description) استفاده می‌شود.
+    """
+
+    default_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.selected_fields(self.context.get('request'))
+        for name in set(self.fields) - selected:
+            self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, request):
+        allowed = set(cls.Meta.fields)
+        param = request.query_params.get('fields', '') if request is not None else ''
+        requested = {name.strip() for name in param.split(',')} & allowed
+        return requested or set(cls.default_fields or allowed)
+
+
+class ProductSerializer(SparseFieldsSerializer):
+    final_price = serializers.IntegerField(source='effective_price', read_only=True)
+
+    default_fields = ('id', 'name', 'slug', 'price', 'discount', 'final_price', 'enabled', 'count',
+                      'category', 'image')
+
+    class Meta:
+        model = shop_models.Product
+        fields = ('id', 'uuid', 'name', 'slug', 'price', 'discount', 'final_price', 'enabled', 'count',
+                  'category', 'image', 'description', 'create_date', 'modified_date')
+
+
+class CategorySerializer(SparseFieldsSerializer):
+    class Meta:
+        model = shop_models.Category
+        fields = ('id', 'name', 'parent')
+
+
+class OrderSerializer(SparseFieldsSerializer):
+    expansion = serializers.CharField(source='expansion_name', read_only=True)
+    realm = serializers.CharField(source='realm_name', read_only=True)
+
+    default_fields = ('id', 'title', 'faction', 'region', 'expansion', 'realm', 'min_reserve',
+                      'price_per_1k', 'amount', 'rest', 'filled_percent', 'status', 'created_at')
+
+    class Meta:
+        model = core_models.Order
+        fields = ('id', 'uuid', 'title', 'faction', 'region', 'expansion', 'realm', 'min_reserve',
+                  'price_per_1k', 'amount', 'rest', 'filled_percent', 'status', 'description',
+                  'created_at', 'updated_at')
+
+
+class CoachSerializer(SparseFieldsSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    expansions = serializers.SlugRelatedField(slug_field='name', many=True, read_only=True)
+    methods = serializers.SlugRelatedField(slug_field='name', many=True, read_only=True)
+
+    default_fields = ('id', 'username', 'expansions', 'methods', 'timeplay')
+
+    class Meta:
+        model = core_models.Coach
+        fields = ('id', 'username', 'expansions', 'methods', 'timeplay', 'description')
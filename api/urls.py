@@ -0,0 +1,13 @@
+from rest_framework.routers import SimpleRouter
+
+from . import views
+
+app_name = 'api'
+
+router = SimpleRouter()
+router.register('products', views.ProductViewSet, basename='product')
+router.register('categories', views.CategoryViewSet, basename='category')
+router.register('orders', views.OrderViewSet, basename='order')
+router.register('coaches', views.CoachViewSet, basename='coach')
+
+urlpatterns = router.urls
@@ -0,0 +1,105 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import viewsets
+from rest_framework.response import Response
+
+from core import models as core_models
+from core.fragments import get_versions
+from core.views import filter_orders
+from shop import models as shop_models
+from shop.views import filter_products
+
+from . import serializers
+from .pagination import CatalogCursorPagination
+
+
+class CachedReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API فقط خواندنی و عمومی؛ پاسخ هر کوئری (مسیر + پارامترهای مرتب شده) در cache
+    نگه داشته می‌شود. cache_versions همان شمارنده‌های core.fragments هستند که
+    signal ها با هر تغییر بالا می‌برند؛ API_CACHE_TIMEOUT فقط سقف احتیاطی است.
+    """
+
+    authentication_classes = []
+    pagination_class = CatalogCursorPagination
+    cache_versions = ()
+
+    def get_cache_key(self, request):
+        versions = get_versions(*self.cache_versions)
+        params = sorted(request.query_params.lists())
+        raw = repr([request.build_absolute_uri(request.path), params, sorted(versions.items())]).encode()
+        return f'api:{self.basename}:{hashlib.md5(raw, usedforsecurity=False).hexdigest()}'
+
+    def cached(self, method, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = method(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(super().retrieve, request, *args, **kwargs)
+
+    def defer_unselected(self, queryset, *names):
+        # ستون‌های سنگین فقط وقتی از دیتابیس خوانده می‌شوند که در ?fields= خواسته شوند
+        selected = self.get_serializer_class().selected_fields(self.request)
+        deferred = [name for name in names if name not in selected]
+        return queryset.defer(*deferred) if deferred else queryset
+
+
+class ProductViewSet(CachedReadOnlyViewSet):
+    serializer_class = serializers.ProductSerializer
+    # داده دسته‌بندی هم در خروجی است، پس تغییر نام دسته هم cache را باطل می‌کند
+    cache_versions = ('home_products', 'categories')
+
+    @property
+    def ordering(self):
+        # با ?q= مثل صفحه فروشگاه بر اساس رتبه جستجو
+        if self.action == 'list' and self.request.query_params.get('q', '').strip():
+            return ('-search_score', '-id')
+        return ('-create_date', '-id')
+
+    def get_queryset(self):
+        # همان فیلترهای صفحه فروشگاه: ?category= (با زیردسته‌ها) و ?q=
+        queryset = filter_products(self.request) if self.action == 'list' else shop_models.Product.objects.all()
+        return self.defer_unselected(queryset, 'description', 'image_variants')
+
+
+class CategoryViewSet(CachedReadOnlyViewSet):
+    serializer_class = serializers.CategorySerializer
+    ordering = ('id',)
+    cache_versions = ('categories',)
+
+    def get_queryset(self):
+        return shop_models.Category.objects.filter(deleted=False)
+
+
+class OrderViewSet(CachedReadOnlyViewSet):
+    serializer_class = serializers.OrderSerializer
+    ordering = ('-created_at', '-id')
+    cache_versions = ('home_orders',)
+
+    def get_queryset(self):
+        # فقط سفارش‌های باز؛ فیلترهای faction/region/expansion مثل صفحه سفارش‌ها
+        queryset = filter_orders(self.request) if self.action == 'list' else core_models.Order.objects.all()
+        return self.defer_unselected(queryset.filter(status='available'), 'description')
+
+
+class CoachViewSet(CachedReadOnlyViewSet):
+    serializer_class = serializers.CoachSerializer
+    ordering = ('-id',)
+    cache_versions = ('coaches',)
+
+    def get_queryset(self):
+        queryset = core_models.Coach.objects.filter(enable=True).select_related('user').prefetch_related(
+            'expansions', 'methods')
+        return self.defer_unselected(queryset, 'description')
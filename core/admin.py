@@ -110,3 +110,12 @@ class CoachAdmin(admin.ModelAdmin):
 
 # -------------------------------------------------------------------------------------------------
 
+class GoldReservationAdmin(admin.ModelAdmin):
+    list_display = ['order', 'offer', 'quantity', 'status', 'created_at', 'released_at']
+    list_filter = ['status']
+    search_fields = ['order__title', 'offer__seller__username']
+    readonly_fields = ['order', 'offer', 'quantity', 'created_at', 'released_at']
+
+admin.site.register(models.GoldReservation, GoldReservationAdmin)
+
+# -------------------------------------------------------------------------------------------------
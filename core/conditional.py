@@ -0,0 +1,71 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Subquery, Value
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from shop.cart import CartStore
+
+
+def scalar_subquery(queryset, aggregate):
+    """
+    aggregate روی queryset به صورت یک subquery اسکالر، تا اعتبارسنج‌ها بتوانند
+    آمار چند جدول را در یک کوئری aggregate جمع کنند.
+    """
+    return Subquery(
+        queryset.order_by().annotate(_all=Value(1)).values('_all').annotate(value=aggregate).values('value')
+    )
+
+
+def request_fingerprint(request):
+    """
+    بخش‌هایی از صفحه که به خود کاربر بستگی دارند (هدر: نام کاربر، لینک داشبورد،
+    تعداد سبد خرید) و پارامترهای GET که خروجی را عوض می‌کنند.
+    """
+    user = request.user
+    return [
+        user.pk if user.is_authenticated else None,
+        user.is_staff if user.is_authenticated else False,
+        CartStore.for_request(request).count(),
+        sorted(request.GET.lists()),
+    ]
+
+
+def conditional_get(validator):
+    """
+    دکوریتور GET برای پاسخ 304 پیش از ساخت queryset ها و رندر قالب.
+
+    validator(request, *args, **kwargs) باید (last_modified, parts) برگرداند که با
+    یک کوئری aggregate محاسبه شده‌اند؛ None یعنی بررسی انجام نشود (مثلا 404).
+    ETag از parts (شامل شمارش‌ها، تا حذف و تایید کامنت هم دیده شود) و
+    request_fingerprint ساخته می‌شود. 304 فقط با ETag داده می‌شود: بیشینه زمان‌ها
+    حذف ردیف‌ها را نمی‌بیند، پس Last-Modified فقط اطلاعاتی است و If-Modified-Since
+    به تنهایی هیچ‌وقت 304 نمی‌گیرد.
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            state = validator(request, *args, **kwargs)
+            if state is None:
+                return view(request, *args, **kwargs)
+
+            last_modified, parts = state
+            raw = repr([parts, request_fingerprint(request)]).encode()
+            etag = quote_etag(hashlib.md5(raw, usedforsecurity=False).hexdigest())
+            last_modified = last_modified and int(last_modified.timestamp())
+
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+
+            if response.status_code in (200, 304):
+                response.headers.setdefault('ETag', etag)
+                if last_modified:
+                    response.headers.setdefault('Last-Modified', http_date(last_modified))
+                # صفحه به کاربر/سشن بستگی دارد؛ مرورگر باید هر بار اعتبارسنجی کند
+                patch_cache_control(response, private=True, no_cache=True)
+                patch_vary_headers(response, ['Cookie'])
+            return response
+        return inner
+    return decorator
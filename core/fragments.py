@@ -0,0 +1,34 @@
+import time
+
+from django.core.cache import cache
+
+KEY = 'fragment-version:{}'
+
+
+def _fresh_version():
+    # اگر کلید نسخه از cache پاک شده باشد، با عدد جدیدی شروع می‌کنیم تا
+    # fragment های قدیمیِ باقی‌مانده با نسخه‌های قبلی دوباره استفاده نشوند
+    return int(time.time() * 1000)
+
+
+def get_versions(*names):
+    """نسخه فعلی هر گروه fragment را با یک رفت‌وبرگشت به cache برمی‌گرداند"""
+    keys = {name: KEY.format(name) for name in names}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for name, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = _fresh_version()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+        versions[name] = version
+    return versions
+
+
+def bump_version(name):
+    key = KEY.format(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
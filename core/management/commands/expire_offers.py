@@ -0,0 +1,28 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.reservations import expire_stale_offers
+
+
+class Command(BaseCommand):
+    help = 'Expire stale pending offers and return their reserved gold to the orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=int, default=settings.OFFER_EXPIRY_MINUTES,
+                            help='Expire pending offers older than this many minutes.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running and sweep every N seconds.')
+
+    def handle(self, *args, **options):
+        older_than = timedelta(minutes=options['minutes'])
+
+        while True:
+            expired = expire_stale_offers(older_than, batch_size=options['batch_size'])
+            self.stdout.write(f'{expired} offer(s) expired.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,64 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Offer, ProofBlob
+from core.signals import refresh_proof_refs
+from core.storage import proof_storage
+
+
+class Command(BaseCommand):
+    help = 'Delete proof files that no offer references any more.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24,
+                            help='Only collect files unreferenced and older than this.')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        blobs = ProofBlob.objects.filter(ref_count=0, created_at__lt=cutoff)
+        refresh_proof_refs(list(blobs.values_list('name', flat=True)))
+
+        deleted = 0
+        for blob in blobs.iterator(chunk_size=200):
+            if options['dry_run']:
+                if not Offer.objects.filter(proof=blob.name).exists():
+                    deleted += 1
+                continue
+            if self.collect(blob):
+                self.prune_shards(blob.name)
+                deleted += 1
+
+        self.stdout.write(f'{deleted} proof file(s) collected.')
+
+    @staticmethod
+    def collect(blob):
+        """
+        حذف ردیف و فایل در یک تراکنش. DELETE شرطی اول قفل نوشتن را می‌گیرد، پس
+        آپلودی که هم‌زمان همین فایل را به یک Offer وصل می‌کند (UPDATE Offer و ثبت
+        ProofBlob در یک تراکنش) یا قبل از ما commit شده و اینجا دیده می‌شود، یا بعد
+        از ما ردیف تازه می‌سازد و فایل گم‌شده را دوباره می‌نویسد.
+        """
+        with transaction.atomic():
+            if not ProofBlob.objects.filter(pk=blob.pk, ref_count=0).delete()[0]:
+                return False
+            # ممکن است بین شمارش و حذف، Offer جدیدی به همین فایل اشاره کرده باشد
+            if Offer.objects.filter(proof=blob.name).exists():
+                transaction.set_rollback(True)
+                return False
+            proof_storage.delete(blob.name)
+        return True
+
+    @staticmethod
+    def prune_shards(name):
+        shard = os.path.dirname(proof_storage.path(name))
+        for _ in range(2):
+            try:
+                os.rmdir(shard)
+            except OSError:
+                break
+            shard = os.path.dirname(shard)
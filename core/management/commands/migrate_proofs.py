@@ -0,0 +1,51 @@
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.models import Offer
+from core.signals import refresh_proof_refs, register_proof_blob
+from core.storage import proof_storage
+
+
+class Command(BaseCommand):
+    help = 'Move existing Offer proof files into the content-addressed proof storage.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the old files after moving them.')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        offers = (
+            Offer.objects.exclude(proof='').exclude(proof__isnull=True)
+            .exclude(proof__startswith=f'{proof_storage.prefix}/')
+            .only('pk', 'proof')
+        )
+        moved = missing = 0
+        new_names = set()
+        old_names = set()
+
+        for offer in offers.iterator(chunk_size=200):
+            old = offer.proof.name
+            if not default_storage.exists(old):
+                missing += 1
+                self.stderr.write(f'missing: {old}')
+                continue
+            if options['dry_run']:
+                moved += 1
+                continue
+
+            with default_storage.open(old) as f:
+                new = proof_storage.save(old, File(f, name=old))
+            register_proof_blob(new, proof_storage.size(new))
+            Offer.objects.filter(pk=offer.pk).update(proof=new)
+            new_names.add(new)
+            old_names.add(old)
+            moved += 1
+
+        refresh_proof_refs(new_names)
+        if not options['keep']:
+            for old in old_names - new_names:
+                default_storage.delete(old)
+
+        self.stdout.write(f'{moved} proof(s) moved, {missing} missing.')
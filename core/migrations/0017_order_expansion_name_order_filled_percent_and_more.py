@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+
+
+def backfill_order_board(apps, schema_editor):
+    Order = apps.get_model('core', 'Order')
+    expansions = Order.expansion.through.objects.filter(order_id=OuterRef('pk')).order_by('expansion_id')
+    realms = Order.realm.through.objects.filter(order_id=OuterRef('pk')).order_by('realm_id')
+    Order.objects.update(
+        primary_expansion=Subquery(expansions.values('expansion_id')[:1]),
+        expansion_name=Coalesce(Subquery(expansions.values('expansion__name')[:1]), Value('')),
+        primary_realm=Subquery(realms.values('realm_id')[:1]),
+        realm_name=Coalesce(Subquery(realms.values('realm__name')[:1]), Value('')),
+    )
+    filled = (F('amount') - F('rest')) * 100 / F('amount')
+    Order.objects.exclude(amount=0).update(filled_percent=Greatest(Least(filled, Value(100)), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_order_order_board_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='expansion_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='filled_percent',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='primary_expansion',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.expansion'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='primary_realm',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.realm'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='realm_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='order_board_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['primary_expansion', '-created_at', '-id'], name='order_board_expansion_idx'),
+        ),
+        migrations.RunPython(backfill_order_board, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_order_expansion_name_order_filled_percent_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoldReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('active', 'رزرو شده'), ('released', 'آزاد شده')], default='active', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+                ('offer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reservation', to='core.offer')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='core.order')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='reservation_status_idx')],
+            },
+        ),
+    ]
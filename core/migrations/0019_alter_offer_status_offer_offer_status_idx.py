@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_goldreservation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='offer',
+            name='status',
+            field=models.CharField(choices=[('pending', 'در انتظار تکمیل'), ('review', 'در انتظار بررسی'), ('Awaiting_payment', 'در انتظار پرداخت'), ('paid', 'پرداخت شده'), ('nptapprove', 'تایید نشد'), ('expired', 'منقضی شده')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['status', 'created_at'], name='offer_status_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:25
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_order_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_board_expansion_idx',
+        ),
+    ]
@@ -3,6 +3,8 @@ from django.db import models
 import uuid
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from django.db.models.functions import Greatest, Least
+from .storage import get_proof_storage
 def _get_avatar_upload_path(obj, filename):
     now = timezone.now()
     base_path = 'media'
@@ -66,6 +68,8 @@ class Order(models.Model):
     title = models.CharField('Title', max_length=255)
     uuid = models.UUIDField(unique=True, default=uuid.uuid4)
     created_at = models.DateTimeField(auto_now_add=True)
+    # در همه QuerySet.update ها هم باید مقداردهی شود (برای ETag/Last-Modified)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     description = models.TextField()
     buyer = models.CharField('Buyer', max_length=255)
     expansion = models.ManyToManyField(Expansion,)
@@ -79,6 +83,36 @@ class Order(models.Model):
     rest = models.IntegerField('Rest', default=0)
     # price = models.IntegerField('Price')
 
+    # ستون‌های denormalized برای لیست سفارشات (با signal ها همگام می‌شوند)
+    primary_expansion = models.ForeignKey(Expansion, null=True, blank=True, editable=False,
+                                          on_delete=models.SET_NULL, related_name='+')
+    expansion_name = models.CharField(max_length=100, blank=True, default='', editable=False)
+    primary_realm = models.ForeignKey(Realm, null=True, blank=True, editable=False,
+                                      on_delete=models.SET_NULL, related_name='+')
+    realm_name = models.CharField(max_length=100, blank=True, default='', editable=False)
+    filled_percent = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='order_board_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='order_board_status_idx'),
+        ]
+
+    def get_filled_percent(self):
+        if not self.amount:
+            return 0
+        filled = (self.amount - self.rest) * 100 // self.amount
+        return max(0, min(100, filled))
+
+    @staticmethod
+    def filled_percent_expression(rest):
+        """معادل SQL متد get_filled_percent برای استفاده در QuerySet.update"""
+        filled = (models.F('amount') - rest) * 100 / models.F('amount')
+        return models.Case(
+            models.When(amount__lte=0, then=models.Value(0)),
+            default=Greatest(Least(filled, models.Value(100)), models.Value(0)),
+        )
+
     def __str__(self):
         return f"{self.title}"
 
@@ -91,7 +125,8 @@ class Offer(models.Model):
         ('review', 'در انتظار بررسی'),
         ('Awaiting_payment', 'در انتظار پرداخت'),
         ('paid', 'پرداخت شده'),
-        ('nptapprove', 'تایید نشد')
+        ('nptapprove', 'تایید نشد'),
+        ('expired', 'منقضی شده'),
     ]
 
     order = models.ForeignKey('Order', on_delete=models.CASCADE, related_name='offers')  # هر Offer به یک Order وصل است
@@ -101,7 +136,12 @@ class Offer(models.Model):
     total_price = models.IntegerField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
-    proof = models.FileField(upload_to=_get_avatar_upload_path, null=True, blank=True)
+    proof = models.FileField(upload_to='proofs/', storage=get_proof_storage, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='offer_status_idx'),
+        ]
 
 
     def __str__(self):
@@ -110,6 +150,46 @@ class Offer(models.Model):
 
 
 
+class ProofBlob(models.Model):
+    """یک فایل مدرک در ContentAddressedStorage و تعداد Offer هایی که به آن اشاره می‌کنند"""
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+
+
+class GoldReservation(models.Model):
+    STATUS_ACTIVE = 'active'
+    STATUS_RELEASED = 'released'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, 'رزرو شده'),
+        (STATUS_RELEASED, 'آزاد شده'),
+    ]
+
+    order = models.ForeignKey('Order', on_delete=models.CASCADE, related_name='reservations')
+    offer = models.OneToOneField('Offer', on_delete=models.CASCADE, related_name='reservation')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reservation_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} gold on {self.order_id} ({self.status})"
+
+
+
+
 class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='core_comment')
     coach = models.ForeignKey('Coach', on_delete=models.CASCADE, related_name='comments', null=True, blank=True)
@@ -0,0 +1,144 @@
+import base64
+import json
+import math
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import DateField, Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, next_query, previous_query):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_query = next_query
+        self.previous_query = previous_query
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    صفحه‌بندی بر اساس cursor به جای OFFSET.
+
+    ترتیب روی (date_field, id) است، پیش‌فرض نزولی و با descending=False صعودی
+    (date_field می‌تواند ستون/annotation عددی مثل امتیاز جستجو یا قیمت هم باشد)
+    و توکن‌های ?after= و ?before=
+    آخرین/اولین ردیف صفحه قبلی را نگه می‌دارند؛ بنابراین هیچ COUNT(*) یا
+    OFFSET اجرا نمی‌شود و صفحه‌های عمیق به اندازه صفحه اول هزینه دارند.
+    """
+
+    after_param = 'after'
+    before_param = 'before'
+
+    def __init__(self, queryset, per_page, date_field='created_at', descending=True):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.date_field = date_field
+        self.descending = descending
+
+    @staticmethod
+    def encode_cursor(value, pk):
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        raw = json.dumps([value, pk]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def _is_date_field(self):
+        """ستون مرتب‌سازی تاریخ است یا عدد (annotation هایی مثل search_score هم)"""
+        annotation = self.queryset.query.annotations.get(self.date_field)
+        try:
+            field = annotation.output_field if annotation is not None else \
+                self.queryset.model._meta.get_field(self.date_field)
+        except FieldDoesNotExist:
+            return False
+        return isinstance(field, DateField)
+
+    def decode_cursor(self, token):
+        """
+        توکن ?after=/?before= را به (value, pk) برمی‌گرداند. توکن دستکاری شده یا
+        مربوط به مرتب‌سازی دیگر (نوع value با ستون نمی‌خواند) None است، نه خطای 500.
+        """
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            cursor = json.loads(raw)
+        except (ValueError, TypeError):
+            return None
+        if not isinstance(cursor, list) or len(cursor) != 2:
+            return None
+        value, pk = cursor
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            return None
+
+        if self._is_date_field():
+            if not isinstance(value, str):
+                return None
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                return None
+        elif isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            return None
+        return value, pk
+
+    def _cursor(self, obj):
+        return self.encode_cursor(getattr(obj, self.date_field), obj.pk)
+
+    def _query(self, params, name, token):
+        params = params.copy()
+        params.pop('page', None)
+        params.pop(self.after_param, None)
+        params.pop(self.before_param, None)
+        params[name] = token
+        return params.urlencode()
+
+    def get_page(self, params):
+        field = self.date_field
+        after = self.decode_cursor(params.get(self.after_param, ''))
+        before = self.decode_cursor(params.get(self.before_param, '')) if not after else None
+        # مقایسه و ترتیب برای حرکت به صفحه بعد (forward) و صفحه قبل (backward)
+        forward, backward = ('lt', 'gt') if self.descending else ('gt', 'lt')
+        forward_order, backward_order = ('-', '') if self.descending else ('', '-')
+
+        if before:
+            value, pk = before
+            qs = self.queryset.filter(
+                Q(**{f'{field}__{backward}': value}) | Q(**{field: value, f'pk__{backward}': pk})
+            ).order_by(f'{backward_order}{field}', f'{backward_order}pk')
+        else:
+            qs = self.queryset.order_by(f'{forward_order}{field}', f'{forward_order}pk')
+            if after:
+                value, pk = after
+                qs = qs.filter(
+                    Q(**{f'{field}__{forward}': value}) | Q(**{field: value, f'pk__{forward}': pk})
+                )
+
+        # یک ردیف اضافه برای فهمیدن وجود صفحه بعد، بدون COUNT
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if before:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(after)
+
+        next_query = previous_query = None
+        if rows and has_next:
+            next_query = self._query(params, self.after_param, self._cursor(rows[-1]))
+        if rows and has_previous:
+            previous_query = self._query(params, self.before_param, self._cursor(rows[0]))
+
+        return KeysetPage(rows, has_next, has_previous, next_query, previous_query)
@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+
+from django.db import close_old_connections, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import models
+from .signals import invalidate_home_orders, refresh_proof_refs, register_proof_blob
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationError(Exception):
+    pass
+
+
+def reserve_gold(order, seller, quantity):
+    """
+    رزرو اتمیک گلد روی یک سفارش و ساخت Offer در همان تراکنش.
+
+    کاهش rest با یک UPDATE شرطی (WHERE rest >= quantity) انجام می‌شود،
+    بنابراین دو فروشنده هم‌زمان هرگز نمی‌توانند سفارش را منفی کنند.
+    """
+    with transaction.atomic():
+        updated = models.Order.objects.filter(pk=order.pk, rest__gte=quantity).update(
+            rest=F('rest') - quantity,
+            filled_percent=models.Order.filled_percent_expression(F('rest') - quantity),
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            raise ReservationError('not enough gold left on this order')
+
+        offer = models.Offer.objects.create(
+            order=order,
+            seller=seller,
+            quantity=quantity,
+            price_per_1k=order.price_per_1k,
+            total_price=(quantity / 1000) * order.price_per_1k,
+            status='pending'
+        )
+        models.GoldReservation.objects.create(order=order, offer=offer, quantity=quantity)
+        invalidate_home_orders()
+
+    return offer
+
+
+def submit_proof(offer, video):
+    """
+    ویدیوی مدرک را به یک Offer pending وصل و آن را برای بررسی ('review') می‌فرستد.
+
+    تغییر وضعیت با UPDATE شرطی (WHERE status='pending') انجام می‌شود تا Offer ای که
+    هم‌زمان توسط expire_stale_offers منقضی شده دوباره زنده نشود؛ در آن صورت
+    ReservationError. ProofBlob در همان تراکنش ثبت می‌شود تا gc_proofs فایل را
+    وسط کار پاک نکند، و اگر پیش از آن پاک کرده باشد فایل دوباره نوشته می‌شود.
+    """
+    storage = models.Offer._meta.get_field('proof').storage
+    name = storage.save(video.name, video)
+
+    with transaction.atomic():
+        updated = models.Offer.objects.filter(pk=offer.pk, status='pending').update(
+            proof=name, status='review')
+        register_proof_blob(name, video.size)
+        if updated:
+            refresh_proof_refs([n for n in (name, offer.proof.name) if n])
+        if not storage.exists(name):
+            storage.save(name, video)
+
+    if not updated:
+        raise ReservationError('offer is no longer pending')
+
+
+def expire_stale_offers(older_than, batch_size=500):
+    """
+    Offer های pending قدیمی‌تر از older_than را منقضی می‌کند و گلد رزرو شده را
+    به سفارش‌ها برمی‌گرداند. هر Offer با یک UPDATE شرطی (WHERE status='pending')
+    و هر سفارش با یک UPDATE جمع‌شده (F) در batch انجام می‌شود.
+    خروجی: تعداد Offer های منقضی شده.
+    """
+    cutoff = timezone.now() - older_than
+    expired = 0
+
+    while True:
+        with transaction.atomic():
+            ids = list(
+                models.Offer.objects.select_for_update()
+                .filter(status='pending', created_at__lt=cutoff)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            # هر Offer با UPDATE شرطی خودش؛ Offer ای که بعد از SELECT پذیرفته یا توسط
+            # sweeper دیگری منقضی شده کنار می‌ماند و گلدش دوباره برنگردانده می‌شود
+            pending = models.Offer.objects.filter(status='pending')
+            expired_ids = [pk for pk in ids if pending.filter(pk=pk).update(status='expired')]
+            models.GoldReservation.objects.filter(
+                offer_id__in=expired_ids, status=models.GoldReservation.STATUS_ACTIVE
+            ).update(status=models.GoldReservation.STATUS_RELEASED, released_at=timezone.now())
+
+            totals = (
+                models.Offer.objects.filter(pk__in=expired_ids)
+                .values('order_id')
+                .annotate(total=Sum('quantity'))
+                .order_by()
+            )
+            for row in totals:
+                rest = F('rest') + row['total']
+                models.Order.objects.filter(pk=row['order_id']).update(
+                    rest=rest,
+                    filled_percent=models.Order.filled_percent_expression(rest),
+                    updated_at=timezone.now(),
+                )
+            invalidate_home_orders()
+
+        expired += len(expired_ids)
+        if len(ids) < batch_size:
+            break
+
+    return expired
+
+
+def start_expiry_scheduler(interval, older_than):
+    """اجرای دوره‌ای expire_stale_offers در یک thread پس‌زمینه داخل همین process"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                expire_stale_offers(older_than)
+            except Exception:
+                logger.exception('offer expiry sweep failed')
+            finally:
+                close_old_connections()
+
+    thread = threading.Thread(target=run, name='offer-expiry', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,167 @@
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from shop.models import Product
+
+from . import models
+from .fragments import bump_version
+from .storage import ContentAddressedStorage
+
+
+def refresh_order_board(order_ids):
+    """
+    ستون‌های اکسپنشن/ریلم اصلی سفارش‌ها را با یک UPDATE از جدول‌های M2M پر می‌کند.
+    اکسپنشن/ریلم اصلی همان ردیف با کوچک‌ترین id است.
+    """
+    expansions = models.Order.expansion.through.objects.filter(
+        order_id=OuterRef('pk')
+    ).order_by('expansion_id')
+    realms = models.Order.realm.through.objects.filter(
+        order_id=OuterRef('pk')
+    ).order_by('realm_id')
+
+    models.Order.objects.filter(pk__in=order_ids).update(
+        primary_expansion=Subquery(expansions.values('expansion_id')[:1]),
+        expansion_name=Coalesce(Subquery(expansions.values('expansion__name')[:1]), Value('')),
+        primary_realm=Subquery(realms.values('realm_id')[:1]),
+        realm_name=Coalesce(Subquery(realms.values('realm__name')[:1]), Value('')),
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(pre_save, sender=models.Order)
+def order_filled_percent(sender, instance, **kwargs):
+    instance.filled_percent = instance.get_filled_percent()
+
+
+def _board_order_ids(instance):
+    if isinstance(instance, models.Expansion):
+        through, field = models.Order.expansion.through, 'expansion_id'
+    else:
+        through, field = models.Order.realm.through, 'realm_id'
+    return list(through.objects.filter(**{field: instance.pk}).values_list('order_id', flat=True))
+
+
+@receiver(m2m_changed, sender=models.Order.expansion.through)
+@receiver(m2m_changed, sender=models.Order.realm.through)
+def order_board_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_order_board([instance.pk])
+        return
+
+    # تغییر از سمت Expansion/Realm: سفارش‌های مربوط در pk_set هستند
+    if action == 'pre_clear':
+        # بعد از clear دیگر pk_set نداریم، پس سفارش‌ها را از قبل نگه می‌داریم
+        instance._board_order_ids = _board_order_ids(instance)
+    elif action == 'post_clear':
+        refresh_order_board(getattr(instance, '_board_order_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        refresh_order_board(pk_set)
+
+
+@receiver(post_save, sender=models.Expansion)
+def expansion_renamed(sender, instance, created, **kwargs):
+    if not created:
+        models.Order.objects.filter(primary_expansion=instance).update(
+            expansion_name=instance.name, updated_at=timezone.now())
+
+
+@receiver(post_save, sender=models.Realm)
+def realm_renamed(sender, instance, created, **kwargs):
+    if not created:
+        models.Order.objects.filter(primary_realm=instance).update(
+            realm_name=instance.name, updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=models.Expansion)
+@receiver(pre_delete, sender=models.Realm)
+def board_source_deleting(sender, instance, **kwargs):
+    instance._board_order_ids = _board_order_ids(instance)
+
+
+@receiver(post_delete, sender=models.Expansion)
+@receiver(post_delete, sender=models.Realm)
+def board_source_deleted(sender, instance, **kwargs):
+    refresh_order_board(getattr(instance, '_board_order_ids', []))
+
+
+def register_proof_blob(name, size=0):
+    digest = ContentAddressedStorage.digest_from_name(name)
+    if digest:
+        # قفل ردیف تا اگر gc_proofs همین حالا در حال حذف آن است، صبر کنیم و ردیف تازه بسازیم
+        with transaction.atomic():
+            models.ProofBlob.objects.select_for_update().get_or_create(
+                digest=digest, defaults={'name': name, 'size': size})
+
+
+def refresh_proof_refs(names):
+    """ref_count فایل‌ها را از روی تعداد واقعی Offer های ارجاع‌دهنده با یک UPDATE بازسازی می‌کند"""
+    refs = (
+        models.Offer.objects.filter(proof=OuterRef('name'))
+        .order_by()
+        .values('proof')
+        .annotate(c=Count('pk'))
+        .values('c')
+    )
+    models.ProofBlob.objects.filter(name__in=names).update(
+        ref_count=Coalesce(Subquery(refs), Value(0))
+    )
+
+
+@receiver(pre_save, sender=models.Offer)
+def offer_old_proof(sender, instance, update_fields=None, **kwargs):
+    instance._old_proof = None
+    if instance.pk and (update_fields is None or 'proof' in update_fields):
+        instance._old_proof = sender.objects.filter(pk=instance.pk).values_list('proof', flat=True).first()
+
+
+@receiver(post_save, sender=models.Offer)
+def offer_proof_saved(sender, instance, **kwargs):
+    new = instance.proof.name or None
+    old = getattr(instance, '_old_proof', None) or None
+    if new == old:
+        return
+    if new:
+        register_proof_blob(new, instance.proof.size)
+    refresh_proof_refs([name for name in (old, new) if name])
+
+
+@receiver(post_delete, sender=models.Offer)
+def offer_proof_deleted(sender, instance, **kwargs):
+    if instance.proof.name:
+        refresh_proof_refs([instance.proof.name])
+
+
+def invalidate_home_orders():
+    # بعد از commit، تا رندر هم‌زمان داده قدیمی را با نسخه جدید cache نکند
+    transaction.on_commit(lambda: bump_version('home_orders'))
+
+
+@receiver(post_save, sender=models.Order)
+@receiver(post_delete, sender=models.Order)
+def order_changed(sender, **kwargs):
+    invalidate_home_orders()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version('home_products'))
+
+
+@receiver(post_save, sender=models.Coach)
+@receiver(post_delete, sender=models.Coach)
+def coach_changed(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version('coaches'))
+
+
+@receiver(m2m_changed, sender=models.Coach.expansions.through)
+@receiver(m2m_changed, sender=models.Coach.methods.through)
+def coach_tags_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(lambda: bump_version('coaches'))
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+
+from .uploads import sniff_video_type
+
+DIGEST_RE = re.compile(r'^proofs/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(\.\w+)?$')
+
+# پسوند از روی نوع تشخیص داده شده با magic bytes، نه نام فایل کلاینت
+EXTENSIONS = {
+    'video/mp4': '.mp4',
+    'video/quicktime': '.mov',
+    'video/webm': '.webm',
+    'video/x-msvideo': '.avi',
+    'video/mpeg': '.mpg',
+}
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    فایل‌ها را بر اساس SHA-256 محتوایشان در پوشه‌های shard شده ذخیره می‌کند:
+    proofs/ab/cd/abcd....mp4
+
+    آپلود تکراری دوباره نوشته نمی‌شود و همان نام قبلی برگردانده می‌شود.
+    """
+
+    prefix = 'proofs'
+
+    def save(self, name, content, max_length=None):
+        digest = getattr(content, 'sha256', None) or self.hash_content(content)
+        # محتوای یکسان همیشه یک فایل است، با هر نام و پسوندی که کلاینت فرستاده باشد
+        existing = self.find_digest(digest)
+        if existing:
+            return existing
+        name = self.digest_name(digest, self.sniff_extension(content))
+        return super().save(name, content, max_length=max_length)
+
+    def digest_name(self, digest, ext=''):
+        return f"{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    def find_digest(self, digest):
+        """نام فایل موجود با این digest (فایل‌های قدیمی با پسوند کلاینت هم پیدا می‌شوند)"""
+        directory = os.path.dirname(self.digest_name(digest))
+        try:
+            _, files = self.listdir(directory)
+        except FileNotFoundError:
+            return None
+        for file in files:
+            name = f"{directory}/{file}"
+            if self.digest_from_name(name) == digest:
+                return name
+        return None
+
+    @staticmethod
+    def sniff_extension(content):
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        header = content.read(12)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return EXTENSIONS.get(sniff_video_type(header), '')
+
+    @staticmethod
+    def hash_content(content):
+        sha256 = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return sha256.hexdigest()
+
+    @staticmethod
+    def digest_from_name(name):
+        match = DIGEST_RE.match(name or '')
+        return match.group(1) if match else None
+
+
+proof_storage = ContentAddressedStorage()
+
+
+def get_proof_storage():
+    return proof_storage
@@ -0,0 +1,96 @@
+import hashlib
+
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+PROOF_MAX_SIZE = 30 * 1024 * 1024
+# فضای اضافه برای boundary ها و فیلدهای فرم (csrf و ...)
+PROOF_FORM_OVERHEAD = 64 * 1024
+
+ERROR_SIZE = 'size'
+ERROR_TYPE = 'type'
+
+
+def sniff_video_type(header):
+    """نوع ویدیو را از magic bytes ابتدای فایل تشخیص می‌دهد (نه content_type کلاینت)"""
+    if header[4:8] == b'ftyp':
+        return 'video/quicktime' if header[8:10] == b'qt' else 'video/mp4'
+    if header[4:8] in (b'moov', b'mdat', b'wide', b'free'):
+        return 'video/quicktime'
+    if header[:4] == b'\x1a\x45\xdf\xa3':
+        return 'video/webm'
+    if header[:4] == b'RIFF' and header[8:12] == b'AVI ':
+        return 'video/x-msvideo'
+    if header[:4] in (b'\x00\x00\x01\xba', b'\x00\x00\x01\xb3'):
+        return 'video/mpeg'
+    return None
+
+
+class ProofUploadHandler(TemporaryFileUploadHandler):
+    """
+    آپلود ویدیوی مدرک را مستقیم و تکه‌تکه روی دیسک می‌نویسد.
+
+    بدنه‌های بزرگ‌تر از سقف از روی Content-Length و حین دریافت رد می‌شوند،
+    نوع فایل از magic bytes بررسی می‌شود و SHA-256 هم‌زمان با نوشتن محاسبه
+    و روی فایل نهایی (file.sha256) قرار می‌گیرد.
+    """
+
+    field_name = 'video'
+    header_size = 12
+
+    def __init__(self, request=None, max_size=PROOF_MAX_SIZE):
+        super().__init__(request)
+        self.max_size = max_size
+        self.error = None
+        self.active = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > self.max_size + PROOF_FORM_OVERHEAD:
+            # بدون خواندن حتی یک بایت از بدنه درخواست
+            self.error = ERROR_SIZE
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, field_name, *args, **kwargs):
+        self.active = field_name == self.field_name
+        if not self.active:
+            return
+        super().new_file(field_name, *args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.header = b''
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        self.size += len(raw_data)
+        if self.size > self.max_size:
+            self.error = ERROR_SIZE
+            raise StopUpload(connection_reset=True)
+
+        if len(self.header) < self.header_size:
+            self.header += raw_data[:self.header_size - len(self.header)]
+            if len(self.header) >= self.header_size and not sniff_video_type(self.header):
+                self.error = ERROR_TYPE
+                raise StopUpload()
+
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+
+        content_type = sniff_video_type(self.header)
+        if content_type is None:
+            self.error = ERROR_TYPE
+            self.file.close()
+            return None
+
+        file = super().file_complete(file_size)
+        file.content_type = content_type
+        file.sha256 = self.sha256.hexdigest()
+        return file
@@ -1,6 +1,13 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
-from django.core.paginator import Paginator
+from django.db.models import Count, Exists, Max, OuterRef
+from .conditional import conditional_get, scalar_subquery
+from .pagination import KeysetPaginator
+from .fragments import get_versions
+from .reservations import reserve_gold, submit_proof, ReservationError
+from .uploads import ProofUploadHandler, ERROR_SIZE, ERROR_TYPE
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from . import models
 from django.contrib import messages
 from . import forms
@@ -20,43 +27,64 @@ class AboutView(View):
         return render(request, "core/about.html")
 class HomeView(View):
     def get(self, request, *args, **kwargs):
+        # کوئری‌ها lazy هستند و فقط وقتی fragment در cache نباشد اجرا می‌شوند
         orders = models.Order.objects.filter(status='available')[:3]
         products = Product.objects.all()[:6]
 
         context = {
             'orders': orders,
             'products': products,
+            'versions': get_versions('home_orders', 'home_products'),
+            'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
         }
         return render(request, 'core/home.html', context)
 
-class OredersView(View):
-    def get(self, request):
-        obj = models.Order.objects.all().order_by('-created_at')
+def filter_orders(request):
+    obj = models.Order.objects.all()
+
+
+    # فیلتر GET
+    status = request.GET.get('status')
+    if status:
+        obj = obj.filter(status=status)
 
+    faction = request.GET.get('faction')
+    if faction:
+        obj = obj.filter(faction=faction)
 
-        # فیلتر GET
-        status = request.GET.get('status')
-        if status:
-            obj = obj.filter(status=status)
+    region = request.GET.get('region')
+    if region:
+        obj = obj.filter(region=region)
 
-        faction = request.GET.get('faction')
-        if faction:
-            obj = obj.filter(faction=faction)
+    expansion = request.GET.get('expansion')
+    if expansion and expansion.isdigit():
+        # همه expansion های سفارش (نه فقط primary_expansion که برای نمایش است)؛
+        # subquery روی ایندکس یکتای (order_id, expansion_id) جدول واسط اجرا می‌شود
+        obj = obj.filter(Exists(models.Order.expansion.through.objects.filter(
+            order_id=OuterRef('pk'), expansion_id=expansion,
+        )))
+    return obj
 
-        region = request.GET.get('region')
-        if region:
-            obj = obj.filter(region=region)
 
-        expansion = request.GET.get('expansion')
-        if expansion:
-            obj = obj.filter(expansion__id=expansion)
+def order_list_state(request):
+    # هر تغییر سفارش (حتی QuerySet.update) updated_at را جلو می‌برد
+    state = filter_orders(request).aggregate(
+        modified=Max('updated_at'),
+        count=Count('id'),
+        expansion_count=Max(scalar_subquery(models.Expansion.objects.all(), Count('id'))),
+    )
+    return state['modified'], sorted(state.items())
 
 
+@method_decorator(conditional_get(order_list_state), name='get')
+class OredersView(View):
+    def get(self, request):
+        obj = filter_orders(request)
+
         expansions = models.Expansion.objects.all()
 
-        paginator = Paginator(obj, 3)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        paginator = KeysetPaginator(obj, 3)
+        page_obj = paginator.get_page(request.GET)
 
         return render(request, 'core/orders.html', {
             'page_obj': page_obj,
@@ -66,6 +94,7 @@ class OredersView(View):
 
 
 @method_decorator(login_required, name="dispatch")
+@method_decorator(csrf_exempt, name="dispatch")
 class OredersDetailView(View):
     def get(self, request, id):
         order = models.Order.objects.get(id=id)
@@ -81,6 +110,23 @@ class OredersDetailView(View):
         })
 
     def post(self, request, id):
+        # هندلر باید قبل از خواندن request.POST (یعنی قبل از بررسی CSRF) تنظیم شود؛
+        # دسترسی به request.FILES بدنه را همین‌جا با این هندلر parse می‌کند
+        upload = ProofUploadHandler(request)
+        request.upload_handlers = [upload]
+        request.FILES
+
+        if upload.error == ERROR_SIZE:
+            messages.error(request, "حجم ویدیو نباید بیشتر از ۳۰ مگابایت باشد.")
+            return redirect("core:order_detail", id=id)
+        if upload.error == ERROR_TYPE:
+            messages.error(request, "فقط فایل ویدیویی قابل قبول است.")
+            return redirect("core:order_detail", id=id)
+
+        return self.handle_post(request, id)
+
+    @method_decorator(csrf_protect)
+    def handle_post(self, request, id):
         order = models.Order.objects.get(id=id)
 
 
@@ -96,43 +142,26 @@ class OredersDetailView(View):
                 return redirect("core:order_detail", id=order.id)
 
 
-            offer = models.Offer.objects.create(
-                order=order,
-                seller=request.user,
-                quantity=gold,
-                price_per_1k=order.price_per_1k,
-                total_price=(gold / 1000) * order.price_per_1k,
-                status="pending"
-            )
-
-            order.rest -= offer.quantity
-            order.save()
+            try:
+                reserve_gold(order, request.user, gold)
+            except ReservationError:
+                messages.error(request, "مقدار وارد شده معتبر نیست!")
 
             return redirect("core:order_detail", id=order.id)
 
         if "video" in request.FILES:
+            # نوع (magic bytes) و حجم فایل حین آپلود توسط ProofUploadHandler بررسی شده است
             video = request.FILES["video"]
 
-            # چک نوع فایل
-            allowed_types = ["video/mp4", "video/mpeg", "video/avi", "video/mov", "video/webm"]
-            if video.content_type not in allowed_types:
-                messages.error(request, "فقط فایل ویدیویی قابل قبول است.")
-                return redirect("core:order_detail", id=order.id)
-
-            # چک حجم
-            max_size = 30 * 1024 * 1024
-            if video.size > max_size:
-                messages.error(request, "حجم ویدیو نباید بیشتر از ۳۰ مگابایت باشد.")
-                return redirect("core:order_detail", id=order.id)
-
-            offer = models.Offer.objects.filter(order=order, seller=request.user).last()
+            offer = models.Offer.objects.filter(order=order, seller=request.user, status='pending').last()
             if not offer:
                 messages.error(request, "پیشنهاد یافت نشد.")
                 return redirect("core:order_detail", id=order.id)
 
-            offer.proof = video
-            offer.status = "review"
-            offer.save()
+            try:
+                submit_proof(offer, video)
+            except ReservationError:
+                messages.error(request, "مهلت این پیشنهاد به پایان رسیده است.")
 
             return redirect("core:order_detail", id=order.id)
 
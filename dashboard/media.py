@@ -0,0 +1,88 @@
+import mimetypes
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    هدر Range تک‌بازه‌ای را به (start, end) تبدیل می‌کند.
+    None یعنی هدر نامعتبر/چندبازه‌ای است و باید کل فایل فرستاده شود؛
+    False یعنی بازه خارج از فایل است (416).
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+
+    if not start:
+        # bytes=-500 یعنی ۵۰۰ بایت آخر
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_range(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            data = file.read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def serve_file(request, field_file):
+    """
+    سرو فایل با پشتیبانی از Range (پاسخ 206) برای seek کردن ویدیو.
+
+    اگر PROOF_MEDIA_OFFLOAD روی 'x-accel-redirect' (nginx) یا 'x-sendfile'
+    (apache/lighttpd) باشد، ارسال فایل به وب‌سرور سپرده می‌شود.
+    """
+    name = field_file.name
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    offload = getattr(settings, 'PROOF_MEDIA_OFFLOAD', None)
+    if offload == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.PROOF_MEDIA_ACCEL_PREFIX + name
+        return response
+    if offload == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = field_file.path
+        return response
+
+    size = field_file.size
+    byte_range = parse_range(request.headers.get('Range', ''), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(field_file.open('rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(iter_range(field_file.open('rb'), start, length),
+                                status=206, content_type=content_type)
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    return response
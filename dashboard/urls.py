@@ -25,6 +25,7 @@ urlpatterns = [
     path('offers/', views.offer_list, name='offer_list'),
     path('offers/<int:pk>/', views.offer_detail, name='offer_detail'),
     path('offers/<int:pk>/update-status/', views.offer_update_status, name='offer_update_status'),
+    path('offers/<int:pk>/proof/', views.offer_proof, name='offer_proof'),
 
     # Products
     path('products/', views.product_list, name='product_list'),
@@ -2,7 +2,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.db.models import Sum, Count, Q
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 from django.utils import timezone
 from django.urls import reverse
 from datetime import timedelta
@@ -10,6 +10,8 @@ from django.views.decorators.http import require_POST
 from account.models import User
 from core.models import Order, Offer, Comment, Coach, FastSell, BuyGold, Expansion, Realm, Method
 from shop.models import Product, Category, Invoice, InvoiceItem, ShopComment, Payment
+from shop.search import search_products
+from .media import serve_file
 
 
 # Helper function - فقط ادمین‌ها دسترسی دارن
@@ -387,6 +389,17 @@ def offer_detail(request, pk):
     return render(request, 'dashboard/offers/detail.html', context)
 
 
+@login_required
+@user_passes_test(is_admin)
+def offer_proof(request, pk):
+    """پخش/دانلود فایل مدرک با پشتیبانی از Range"""
+    offer = get_object_or_404(Offer.objects.only('pk', 'proof'), pk=pk)
+    if not offer.proof:
+        raise Http404
+
+    return serve_file(request, offer.proof)
+
+
 @login_required
 @user_passes_test(is_admin)
 def offer_update_status(request, pk):
@@ -413,7 +426,7 @@ def product_list(request):
     # جستجو
     search = request.GET.get('search', '')
     if search:
-        products = products.filter(name__icontains=search)
+        products = search_products(products, search).order_by('-search_score', '-create_date')
 
     context = {'products': products, 'search': search}
     return render(request, 'dashboard/products/list.html', context)
@@ -717,14 +730,17 @@ def invoice_list(request):
 
     # 2. اعمال فیلتر جستجوی کلی (Search)
     if search:
-        # جستجو در username، email، شماره فاکتور، و battle_tag
-        invoices = invoices.filter(
-            Q(user__username__icontains=search) |
-            Q(user__email__icontains=search) |
-            Q(number__icontains=search) |
-            Q(id__icontains=search) | # برای اطمینان از جستجو بر اساس ID در صورت نبود number
-            Q(battle_tag__icontains=search)
-        )
+        # شماره فاکتور (مثلاً 1024 یا #1024): تطبیق دقیق روی ایندکس یکتای number
+        number = search.strip().lstrip('#')
+        if number.isdigit():
+            invoices = invoices.filter(number=int(number))
+        else:
+            # جستجو در username، email و battle_tag
+            invoices = invoices.filter(
+                Q(user__username__icontains=search) |
+                Q(user__email__icontains=search) |
+                Q(battle_tag__icontains=search)
+            )
 
     # 3. اعمال فیلتر تاریخ (Date Range)
     if date_from:
@@ -1237,7 +1253,7 @@ def category_create(request):
                     except Category.DoesNotExist:
                         messages.error(request, 'دسته‌بندی والد یافت نشد.')
                         return render(request, 'dashboard/categories/create.html', {
-                            'parents': Category.objects.filter(parent__isnull=True, deleted=False)
+                            'parents': category_parent_choices()
                         })
 
                 Category.objects.create(
@@ -1248,13 +1264,20 @@ def category_create(request):
                 messages.success(request, 'دسته‌بندی با موفقیت ایجاد شد.')
                 return redirect('dashboard:category_list')
 
-    # دسته‌بندی‌های اصلی برای انتخاب به عنوان Parent
-    parents = Category.objects.filter(parent__isnull=True, deleted=False).order_by('name')
+    # دسته‌بندی‌ها برای انتخاب به عنوان Parent (درخت در هر عمقی)
+    parents = category_parent_choices()
 
     context = {'parents': parents}
     return render(request, 'dashboard/categories/create.html', context)
 
 
+def category_parent_choices(category=None):
+    parents = Category.objects.filter(deleted=False).order_by('name')
+    if category is not None:
+        parents = parents.exclude(ancestor_links__ancestor=category)
+    return parents
+
+
 @login_required
 @user_passes_test(is_admin)
 def category_edit(request, pk):
@@ -1277,27 +1300,21 @@ def category_edit(request, pk):
                     try:
                         parent = Category.objects.get(id=parent_id, deleted=False)
 
-                        # جلوگیری از انتخاب خودش یا فرزندانش به عنوان Parent
-                        if parent.id == category.id:
-                            messages.error(request, 'نمی‌توانید دسته‌بندی را به عنوان والد خودش انتخاب کنید.')
-                            parents = Category.objects.filter(parent__isnull=True, deleted=False).exclude(pk=pk)
-                            return render(request, 'dashboard/categories/edit.html', {
-                                'category': category,
-                                'parents': parents
-                            })
-
-                        # بررسی که parent از فرزندان category نباشه
-                        if parent.parent and parent.parent.id == category.id:
-                            messages.error(request, 'نمی‌توانید فرزند دسته‌بندی را به عنوان والد آن انتخاب کنید.')
-                            parents = Category.objects.filter(parent__isnull=True, deleted=False).exclude(pk=pk)
+                        # جلوگیری از انتخاب خودش یا فرزندانش (در هر عمقی) به عنوان Parent
+                        # با یک lookup روی جدول closure
+                        if category.is_ancestor_of(parent.id):
+                            if parent.id == category.id:
+                                messages.error(request, 'نمی‌توانید دسته‌بندی را به عنوان والد خودش انتخاب کنید.')
+                            else:
+                                messages.error(request, 'نمی‌توانید فرزند دسته‌بندی را به عنوان والد آن انتخاب کنید.')
                             return render(request, 'dashboard/categories/edit.html', {
                                 'category': category,
-                                'parents': parents
+                                'parents': category_parent_choices(category)
                             })
 
                     except Category.DoesNotExist:
                         messages.error(request, 'دسته‌بندی والد یافت نشد.')
-                        parents = Category.objects.filter(parent__isnull=True, deleted=False).exclude(pk=pk)
+                        parents = category_parent_choices(category)
                         return render(request, 'dashboard/categories/edit.html', {
                             'category': category,
                             'parents': parents
@@ -1310,8 +1327,8 @@ def category_edit(request, pk):
                 messages.success(request, 'دسته‌بندی با موفقیت ویرایش شد.')
                 return redirect('dashboard:category_list')
 
-    # دسته‌بندی‌های اصلی برای انتخاب به عنوان Parent (به جز خودش)
-    parents = Category.objects.filter(parent__isnull=True, deleted=False).exclude(pk=pk).order_by('name')
+    # دسته‌بندی‌هایی که می‌توانند Parent باشند (به جز خودش و زیردسته‌هایش)
+    parents = category_parent_choices(category)
 
     context = {
         'category': category,
@@ -46,12 +46,22 @@ admin.site.register(models.Category, CategoryAdmin)
 #-------------------------------------------------------------------------------------------------
 class InvoiceAdmin(admin.ModelAdmin):
     inlines = [InvoiceItemInline]
-    list_display = ['__str__', 'user', 'battle_tag', 'total', 'date', 'payment__status', 'payment__ref',]
+    list_display = ['__str__', 'number', 'user', 'battle_tag', 'total', 'date', 'payment__status', 'payment__ref',]
     list_filter = ['payment__status', 'user',]
-    search_fields = ['user', 'battle_tag', 'payment__ref',]
+    search_fields = ['=number', 'user__username', 'battle_tag', 'payment__ref',]
 
 admin.site.register(models.Invoice, InvoiceAdmin)
 
+#-------------------------------------------------------------------------------------------------
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['invoice', 'product', 'quantity', 'status', 'created_at', 'expires_at', 'closed_at']
+    list_filter = ['status']
+    search_fields = ['product__name', 'invoice__user__username']
+    readonly_fields = ['invoice', 'product', 'quantity', 'created_at', 'expires_at', 'closed_at']
+
+
+admin.site.register(models.StockReservation, StockReservationAdmin)
+
 #-------------------------------------------------------------------------------------------------
 
 # class ShopCommentAdmin(admin.ModelAdmin):
@@ -0,0 +1,254 @@
+import secrets
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import models
+from .pricing import line_total, vat_amount
+
+CART_COOKIE = 'cart'
+CART_COOKIE_AGE = 30 * 24 * 60 * 60
+COUNT_KEY = 'cart-count:{}'
+# changed() فقط cache همین process را پاک می‌کند؛ با LocMem بقیه worker ها حداکثر این مدت (ثانیه) عدد قدیمی نشان می‌دهند
+COUNT_TIMEOUT = 30
+
+OPERATIONS = ('add', 'set', 'decrease', 'remove')
+MAX_OPERATIONS = 100
+MAX_LINE_COUNT = 1000
+
+
+class CartError(ValueError):
+    pass
+
+
+# نرخ پیش‌فرض مالیات همان مقدار پیش‌فرض فیلد vat در Invoice است
+DEFAULT_VAT = models.Invoice._meta.get_field('vat').default
+
+
+class CartStore:
+    """
+    سبد خرید در جدول CartLine به جای session.
+
+    هر تغییر یک UPDATE/INSERT/DELETE روی یک ردیف ایندکس شده است و تعداد اقلام
+    (badge هدر) در cache نگه داشته می‌شود تا رندر صفحات به دیتابیس نرسد.
+    """
+
+    def __init__(self, owner):
+        self.owner = owner
+
+    @classmethod
+    def for_user(cls, user):
+        return cls(f'user:{user.pk}')
+
+    @classmethod
+    def for_guest(cls, token):
+        return cls(f'anon:{token[:48]}')
+
+    @classmethod
+    def for_request(cls, request, create=False):
+        """
+        سبد کاربر وارد شده یا سبد مهمان (کوکی cart). برای مهمان بدون کوکی فقط با
+        create=True توکن ساخته می‌شود و CartCookieMiddleware کوکی را ست می‌کند.
+        """
+        if request.user.is_authenticated:
+            return cls.for_user(request.user)
+        token = request.COOKIES.get(CART_COOKIE) or getattr(request, 'new_cart_token', None)
+        if not token:
+            if not create:
+                return cls(None)
+            token = request.new_cart_token = secrets.token_urlsafe(24)
+        return cls.for_guest(token)
+
+    @property
+    def lines(self):
+        return models.CartLine.objects.filter(owner=self.owner)
+
+    def as_dict(self):
+        """همان شکل قبلی سبد در session: {'<product id>': count}"""
+        if not self.owner:
+            return {}
+        return {str(pk): count for pk, count in self.lines.values_list('product_id', 'count')}
+
+    def count(self):
+        if not self.owner:
+            return 0
+        key = COUNT_KEY.format(self.owner)
+        count = cache.get(key)
+        if count is None:
+            count = self.lines.count()
+            cache.set(key, count, COUNT_TIMEOUT)
+        return count
+
+    def changed(self):
+        transaction.on_commit(lambda: cache.delete(COUNT_KEY.format(self.owner)))
+
+    def add(self, product, count=1):
+        if not self.lines.filter(product=product).update(count=F('count') + count):
+            try:
+                with transaction.atomic():
+                    models.CartLine.objects.create(owner=self.owner, product=product, count=count)
+            except IntegrityError:
+                # درخواست هم‌زمان همین ردیف را ساخته است
+                self.lines.filter(product=product).update(count=F('count') + count)
+        self.changed()
+
+    def decrease(self, product_id):
+        with transaction.atomic():
+            if not self.lines.filter(product_id=product_id, count__gt=1).update(count=F('count') - 1):
+                self.lines.filter(product_id=product_id).delete()
+        self.changed()
+
+    def remove(self, product_id):
+        self.lines.filter(product_id=product_id).delete()
+        self.changed()
+
+    def clear(self):
+        if self.owner:
+            self.lines.delete()
+            self.changed()
+
+    def apply(self, operations):
+        """
+        لیست عملیات [{'op': 'add'|'set'|'decrease'|'remove', 'id': ..., 'count': ...}]
+        را به صورت اتمیک اعمال می‌کند: یک کوئری برای ردیف‌های سبد و محصولاتشان، یک
+        کوئری برای محصولات جدید، سپس یک upsert و یک DELETE فقط برای ردیف‌های تغییر کرده.
+
+        خروجی (سبد جدید به شکل as_dict، شناسه محصولات تغییر کرده، dict محصولات)؛
+        عملیات نامعتبر CartError می‌دهد و هیچ تغییری ذخیره نمی‌شود.
+        """
+        if not isinstance(operations, list) or not 0 < len(operations) <= MAX_OPERATIONS:
+            raise CartError(f'send a list of 1 to {MAX_OPERATIONS} operations')
+        parsed = [self.parse_operation(operation) for operation in operations]
+
+        with transaction.atomic():
+            lines = {line.product_id: line
+                     for line in self.lines.select_for_update().select_related('product')}
+            products = {pk: line.product for pk, line in lines.items()}
+            missing = {pk for _, pk, _ in parsed} - products.keys()
+            if missing:
+                products.update(models.Product.objects.in_bulk(missing))
+
+            counts = {pk: line.count for pk, line in lines.items()}
+            for op, pk, count in parsed:
+                product = products.get(pk)
+                if product is None:
+                    raise CartError(f'product {pk} does not exist')
+                if op in ('add', 'set') and count and not (product.enabled and product.available > 0):
+                    raise CartError(f'product {pk} is not available')
+
+                current = counts.get(pk, 0)
+                if op == 'add':
+                    counts[pk] = current + count
+                elif op == 'set':
+                    counts[pk] = count
+                elif op == 'decrease':
+                    counts[pk] = max(current - count, 0)
+                else:
+                    counts[pk] = 0
+                # تعداد نهایی ردیف نباید از موجودی قابل فروش بیشتر شود (کم کردن همیشه مجاز است)
+                if counts[pk] > current and counts[pk] > product.available:
+                    raise CartError(f'only {max(product.available, 0)} of product {pk} available')
+
+            changed = {pk for pk, count in counts.items()
+                       if count != (lines[pk].count if pk in lines else 0)}
+            models.CartLine.objects.bulk_create(
+                [models.CartLine(owner=self.owner, product_id=pk, count=counts[pk])
+                 for pk in changed if counts[pk]],
+                update_conflicts=True,
+                unique_fields=['owner', 'product'],
+                update_fields=['count', 'updated_at'],
+            )
+            removed = [pk for pk in changed if not counts[pk] and pk in lines]
+            if removed:
+                self.lines.filter(product_id__in=removed).delete()
+        self.changed()
+
+        cart = {str(pk): count for pk, count in counts.items() if count}
+        return cart, changed, products
+
+    @staticmethod
+    def parse_operation(operation):
+        try:
+            op = operation['op']
+            pk = int(operation['id'])
+            count = int(operation.get('count', 0 if op == 'remove' else 1))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise CartError('each operation needs "op" and a numeric "id"')
+        if op not in OPERATIONS:
+            raise CartError(f'unknown operation "{op}"')
+        if count < 0 or count > MAX_LINE_COUNT:
+            raise CartError(f'count must be between 0 and {MAX_LINE_COUNT}')
+        return op, pk, count
+
+    def merge_into(self, other):
+        """انتقال سبد مهمان به سبد کاربر بعد از ورود"""
+        with transaction.atomic():
+            for product_id, count in self.lines.values_list('product_id', 'count'):
+                other.add(models.Product(pk=product_id), count)
+            self.lines.delete()
+        self.changed()
+
+
+class Cart:
+    """
+    سبد خرید (dict شناسه → تعداد) با همه محصولاتش در یک کوئری.
+
+    محصولات در یک dict بر اساس id نگه داشته می‌شوند و قیمت هر ردیف،
+    تخفیف، مالیات و جمع کل (همه عدد صحیح، shop.pricing) در یک دور محاسبه می‌شود.
+    """
+
+    def __init__(self, cart, vat=DEFAULT_VAT, products=None):
+        self.cart = cart
+        self.vat_rate = vat
+        # products: محصولاتی که فراخواننده قبلا خوانده است (dict بر اساس id)
+        if products is None:
+            products = models.Product.objects.in_bulk([int(id) for id in cart.keys()])
+        self.products = products
+
+        self.items = {}
+        self.subtotal = 0
+        self.discount = 0
+        self.total = 0
+        for id, count in cart.items():
+            obj = self.products.get(int(id))
+            if obj is None:
+                # محصول حذف شده و دیگر قابل خرید نیست
+                continue
+            gross = obj.price * count
+            price = line_total(obj.price, obj.discount, count)
+            self.items[str(id)] = {
+                'obj': obj,
+                'count': count,
+                'price': price,
+            }
+            self.subtotal += gross
+            self.discount += gross - price
+            self.total += price
+
+        self.vat = vat_amount(self.total, self.vat_rate)
+        self.grand_total = self.total + self.vat
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def __iter__(self):
+        for id, item in self.items.items():
+            yield id, item
+
+    def invoice_items(self, invoice):
+        return [
+            models.InvoiceItem(
+                invoice=invoice,
+                product=item['obj'],
+                count=item['count'],
+                discount=item['obj'].discount,
+                price=item['obj'].price,
+                name=item['obj'].name,
+                total=item['price'],
+            )
+            for item in self.items.values()
+        ]
@@ -0,0 +1,113 @@
+import csv
+import json
+import os
+import uuid
+
+from django.utils.text import slugify
+
+# ستون‌های فایل‌های import/export محصولات؛ category با نام دسته مشخص می‌شود
+FIELDS = ['uuid', 'name', 'slug', 'category', 'price', 'discount', 'count', 'enabled', 'description']
+FORMATS = ('csv', 'jsonl')
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off', ''}
+
+
+class RowError(ValueError):
+    pass
+
+
+def guess_format(path, default='csv'):
+    ext = os.path.splitext(path or '')[1].lower().lstrip('.')
+    return {'json': 'jsonl', 'ndjson': 'jsonl'}.get(ext, ext) if ext in (*FORMATS, 'json', 'ndjson') else default
+
+
+def read_rows(file, fmt):
+    """
+    ردیف‌ها را یکی‌یکی (بدون خواندن کل فایل در حافظه) به صورت
+    (شماره خط، ردیف) برمی‌گرداند؛ ردیف خراب به صورت RowError برگردانده می‌شود.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(file, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = RowError(f'invalid JSON ({e})')
+        if not isinstance(row, (dict, RowError)):
+            row = RowError('each line must be a JSON object')
+        yield line_no, row
+
+
+def write_rows(file, fmt, rows):
+    if fmt == 'csv':
+        writer = csv.writer(file)
+        writer.writerow(FIELDS)
+        writer.writerows(rows)
+        return
+    for row in rows:
+        file.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n')
+
+
+def _int(value, name):
+    try:
+        return int(float(value or 0))
+    except (TypeError, ValueError):
+        raise RowError(f'{name} must be a number')
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    value = str(value if value is not None else '').strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RowError('enabled must be true/false')
+
+
+def clean_row(row):
+    """یک ردیف خام (CSV/JSON) را به dict مقادیر Product تبدیل می‌کند؛ خطا: RowError"""
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise RowError('name is required')
+    category = str(row.get('category') or '').strip()
+    if not category:
+        raise RowError('category is required')
+
+    try:
+        discount = float(row.get('discount') or 0)
+    except (TypeError, ValueError):
+        raise RowError('discount must be a number')
+    if not 0 <= discount <= 100:
+        raise RowError('discount must be between 0 and 100')
+
+    price = _int(row.get('price'), 'price')
+    count = _int(row.get('count'), 'count')
+    if price < 0 or count < 0:
+        raise RowError('price and count cannot be negative')
+
+    value = str(row.get('uuid') or '').strip()
+    try:
+        product_uuid = uuid.UUID(value) if value else uuid.uuid4()
+    except ValueError:
+        raise RowError('uuid is not valid')
+
+    return {
+        'uuid': product_uuid,
+        'name': name[:255],
+        'slug': str(row.get('slug') or '').strip()[:50] or slugify(name, allow_unicode=True)[:50],
+        'category': category,
+        'price': price,
+        'discount': discount,
+        'count': count,
+        'enabled': _bool(row.get('enabled', True)),
+        'description': str(row.get('description') or ''),
+    }
@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cart import CartStore
+
+
+def cart(request):
+    # فقط وقتی قالب {{ cart_count }} را رندر کند محاسبه می‌شود (از cache)
+    return {'cart_count': SimpleLazyObject(lambda: CartStore.for_request(request).count())}
@@ -4,6 +4,9 @@ from .models import Invoice
 
 
 class InvoiceForm(forms.ModelForm):
+    # کلید idempotency هر بار نمایش فرم؛ ارسال دوباره همان فرم فاکتور دوم نمی‌سازد
+    checkout_key = forms.CharField(widget=forms.HiddenInput, max_length=64, required=False)
+
     class Meta:
         model = Invoice
         fields = ['battle_tag']
@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+from functools import lru_cache
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+REQUEST_PATH = '/pg/v4/payment/request.json'
+VERIFY_PATH = '/pg/v4/payment/verify.json'
+
+
+class GatewayError(Exception):
+    """درگاه در زمان مجاز پاسخ نداد یا پاسخ قابل خواندن نبود"""
+
+
+class LatencyStats:
+    """
+    آمار تاخیر فراخوانی‌های درگاه داخل همین process (برای لاگ/تست بار):
+    تعداد، خطاها و صدک‌ها روی آخرین window فراخوانی هر عملیات.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+
+    def record(self, operation, seconds, ok=True):
+        with self._lock:
+            self._samples.setdefault(operation, deque(maxlen=self.window)).append(seconds)
+            calls, errors = self._counts.get(operation, (0, 0))
+            self._counts[operation] = (calls + 1, errors + (not ok))
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for operation, samples in self._samples.items():
+                ordered = sorted(samples)
+                calls, errors = self._counts[operation]
+                result[operation] = {
+                    'calls': calls,
+                    'errors': errors,
+                    'avg_ms': round(sum(ordered) / len(ordered) * 1000, 1),
+                    'p50_ms': round(ordered[len(ordered) // 2] * 1000, 1),
+                    'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                    'max_ms': round(ordered[-1] * 1000, 1),
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+metrics = LatencyStats()
+
+
+class ZarinPalClient:
+    """
+    کلاینت REST v4 زرین‌پال با یک Session مشترک (اتصال keep-alive و pool).
+
+    هر فراخوانی timeout اتصال/خواندن دارد. PaymentRequest فقط روی خطای اتصال
+    تکرار می‌شود (درخواست هنوز ارسال نشده) تا authority تکراری ساخته نشود؛ verify
+    idempotent است (کد 101) پس روی خطای اتصال، timeout خواندن و 5xx هم تکرار می‌شود.
+    """
+
+    headers = {'accept': 'application/json', 'content-type': 'application/json'}
+
+    def __init__(self, merchant_id, api_url, startpay_url, timeout=(3.05, 10),
+                 retries=2, pool_size=10):
+        self.merchant_id = merchant_id
+        self.api_url = api_url.rstrip('/')
+        self.startpay_url = startpay_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+
+        request_retry = Retry(total=retries, connect=retries, read=0, status=0,
+                              other=0, allowed_methods=None, raise_on_status=False)
+        verify_retry = Retry(total=retries, backoff_factor=0.3, allowed_methods=None,
+                             status_forcelist=(502, 503, 504), raise_on_status=False)
+        self.session.mount(self.api_url, HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=request_retry))
+        # requests طولانی‌ترین prefix را انتخاب می‌کند
+        self.session.mount(self.api_url + VERIFY_PATH, HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=verify_retry))
+
+    def _post(self, operation, path, payload):
+        started = time.monotonic()
+        ok = False
+        try:
+            response = self.session.post(self.api_url + path, json=payload, timeout=self.timeout)
+            data = response.json()
+            ok = True
+            return data
+        except requests.RequestException as e:
+            raise GatewayError(f'zarinpal {operation} failed: {e}') from e
+        except ValueError as e:
+            raise GatewayError(f'zarinpal {operation} returned invalid JSON') from e
+        finally:
+            elapsed = time.monotonic() - started
+            metrics.record(operation, elapsed, ok)
+            logger.info('zarinpal %s %.1fms ok=%s', operation, elapsed * 1000, ok)
+
+    def request_payment(self, amount, callback_url, description, metadata=None):
+        return self._post('request', REQUEST_PATH, {
+            'merchant_id': self.merchant_id,
+            'amount': amount,
+            'callback_url': callback_url,
+            'description': description,
+            'metadata': metadata or {},
+        })
+
+    def verify(self, amount, authority):
+        return self._post('verify', VERIFY_PATH, {
+            'merchant_id': self.merchant_id,
+            'amount': amount,
+            'authority': authority,
+        })
+
+    def start_pay_url(self, authority):
+        return f'{self.startpay_url}{authority}'
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncZarinPalClient:
+    """
+    نسخه async همان کلاینت با httpx.AsyncClient برای view های async: انتظار برای
+    درگاه هیچ thread/worker را اشغال نمی‌کند. سیاست timeout و تکرار مثل
+    ZarinPalClient است (تکرار اتصال در transport و تکرار verify در همین کلاس).
+    """
+
+    verify_retry_statuses = (502, 503, 504)
+
+    def __init__(self, merchant_id, api_url, startpay_url, timeout=(3.05, 10),
+                 retries=2, pool_size=10):
+        self.merchant_id = merchant_id
+        self.startpay_url = startpay_url
+        self.retries = retries
+        connect_timeout, read_timeout = timeout
+        self.client = httpx.AsyncClient(
+            base_url=api_url.rstrip('/'),
+            headers=ZarinPalClient.headers,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            transport=httpx.AsyncHTTPTransport(
+                retries=retries,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            ),
+        )
+
+    async def _post(self, operation, path, payload, retry=False):
+        started = time.monotonic()
+        ok = False
+        attempt = 0
+        try:
+            while True:
+                try:
+                    response = await self.client.post(path, json=payload)
+                    if not (retry and response.status_code in self.verify_retry_statuses
+                            and attempt < self.retries):
+                        data = response.json()
+                        ok = True
+                        return data
+                except httpx.TimeoutException as e:
+                    if not (retry and attempt < self.retries):
+                        raise GatewayError(f'zarinpal {operation} timed out') from e
+                except httpx.HTTPError as e:
+                    raise GatewayError(f'zarinpal {operation} failed: {e}') from e
+                except ValueError as e:
+                    raise GatewayError(f'zarinpal {operation} returned invalid JSON') from e
+                await asyncio.sleep(0.3 * 2 ** attempt)
+                attempt += 1
+        finally:
+            elapsed = time.monotonic() - started
+            metrics.record(operation, elapsed, ok)
+            logger.info('zarinpal %s %.1fms ok=%s', operation, elapsed * 1000, ok)
+
+    async def request_payment(self, amount, callback_url, description, metadata=None):
+        return await self._post('request', REQUEST_PATH, {
+            'merchant_id': self.merchant_id,
+            'amount': amount,
+            'callback_url': callback_url,
+            'description': description,
+            'metadata': metadata or {},
+        })
+
+    async def verify(self, amount, authority):
+        return await self._post('verify', VERIFY_PATH, {
+            'merchant_id': self.merchant_id,
+            'amount': amount,
+            'authority': authority,
+        }, retry=True)
+
+    def start_pay_url(self, authority):
+        return f'{self.startpay_url}{authority}'
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class ThreadedGateway:
+    """
+    همان رابط async روی ZarinPalClient مشترک (Session با pool)، برای view های async
+    زیر WSGI/runserver: آنجا async_to_sync برای هر درخواست event loop تازه می‌سازد و
+    یک AsyncClient به ازای هر loop یعنی اتصال‌هایی که هیچ‌وقت بسته نمی‌شوند و pool
+    بی‌فایده. فراخوانی‌ها در thread pool اجرا می‌شوند، نه روی thread درخواست.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    async def request_payment(self, *args, **kwargs):
+        return await sync_to_async(self.client.request_payment, thread_sensitive=False)(*args, **kwargs)
+
+    async def verify(self, *args, **kwargs):
+        return await sync_to_async(self.client.verify, thread_sensitive=False)(*args, **kwargs)
+
+    def start_pay_url(self, authority):
+        return self.client.start_pay_url(authority)
+
+
+def gateway_options():
+    return {
+        'merchant_id': settings.ZARINPAL_MERCHANT_ID,
+        'api_url': settings.ZARINPAL_API_URL,
+        'startpay_url': settings.ZARINPAL_STARTPAY_URL,
+        'timeout': settings.ZARINPAL_TIMEOUT,
+        'retries': settings.ZARINPAL_RETRIES,
+        'pool_size': settings.ZARINPAL_POOL_SIZE,
+    }
+
+
+@lru_cache
+def get_gateway():
+    return ZarinPalClient(**gateway_options())
+
+
+@lru_cache
+def get_threaded_gateway():
+    return ThreadedGateway(get_gateway())
+
+
+# اتصال‌های httpx به event loop خودشان وابسته‌اند: زیر ASGI یک loop (و یک pool)
+# برای کل process است و کلاینت همراه همان loop تا پایان process می‌ماند.
+_async_gateways = weakref.WeakKeyDictionary()
+
+
+def get_async_gateway(request=None):
+    """کلاینت async برای view؛ درخواستی که از ASGI نیامده کلاینت sync مشترک را می‌گیرد"""
+    if request is not None and not isinstance(request, ASGIRequest):
+        return get_threaded_gateway()
+    loop = asyncio.get_running_loop()
+    gateway = _async_gateways.get(loop)
+    if gateway is None:
+        gateway = _async_gateways[loop] = AsyncZarinPalClient(**gateway_options())
+    return gateway
@@ -0,0 +1,131 @@
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlsplit
+
+from .gateway import REQUEST_PATH, VERIFY_PATH
+
+STARTPAY_PATH = '/pg/StartPay/'
+
+
+class StubGateway(ThreadingHTTPServer):
+    """
+    شبیه‌ساز محلی REST v4 زرین‌پال برای تست و تست بار بدون اینترنت.
+
+    request یک authority می‌سازد، StartPay مستقیم به callback_url با Status=OK
+    برمی‌گردد و verify بار اول کد 100 و بعد از آن 101 می‌دهد. latency (ثانیه) و
+    fail_rate (درصد پاسخ‌های 503) برای شبیه‌سازی درگاه کند/ناپایدار است.
+    unknown نتیجه verify برای authority هایی است که stub نساخته ('failed'، 'paid'
+    یا 'random')؛ مثلاً برای تست reconcile_payments روی پرداخت‌های موجود دیتابیس.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0, fail_rate=0, unknown='failed'):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.unknown = unknown
+        self.payments = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name='zarinpal-stub', daemon=True)
+        thread.start()
+        return thread
+
+    def paid_unknown(self):
+        return self.unknown == 'paid' or (self.unknown == 'random' and random.random() < 0.5)
+
+    def handle_error(self, request, client_address):
+        # کلاینتی که به timeout خورده اتصال را بسته است؛ برای تست بار عادی است
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self.send_json({'data': [], 'errors': {'code': -9, 'message': 'invalid json'}}, 400)
+
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if server.fail_rate and random.random() * 100 < server.fail_rate:
+            return self.send_json({'data': [], 'errors': {'code': -1, 'message': 'unavailable'}}, 503)
+
+        path = urlsplit(self.path).path
+        if path == REQUEST_PATH:
+            authority = 'A' + uuid.uuid4().hex[:35]
+            with server.lock:
+                server.payments[authority] = {
+                    'amount': payload.get('amount'),
+                    'callback_url': payload.get('callback_url'),
+                    'ref_id': random.randint(10 ** 8, 10 ** 9),
+                    'verified': False,
+                }
+            return self.send_json({'data': {'code': 100, 'message': 'Success', 'authority': authority},
+                                   'errors': []})
+
+        if path == VERIFY_PATH:
+            with server.lock:
+                payment = server.payments.get(payload.get('authority'))
+                if payment is None and server.paid_unknown():
+                    payment = server.payments[payload.get('authority')] = {
+                        'amount': payload.get('amount'),
+                        'ref_id': random.randint(10 ** 8, 10 ** 9),
+                        'verified': False,
+                    }
+                if payment is None or payment['amount'] != payload.get('amount'):
+                    return self.send_json({'data': [], 'errors': {'code': -51, 'message': 'failed'}})
+                code = 101 if payment['verified'] else 100
+                payment['verified'] = True
+            return self.send_json({'data': {'code': code, 'message': 'Verified', 'ref_id': payment['ref_id']},
+                                   'errors': []})
+
+        self.send_json({'errors': {'message': 'not found'}}, 404)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if not path.startswith(STARTPAY_PATH):
+            return self.send_json({'errors': {'message': 'not found'}}, 404)
+
+        authority = path[len(STARTPAY_PATH):]
+        with self.server.lock:
+            payment = self.server.payments.get(authority)
+        if payment is None:
+            return self.send_json({'errors': {'message': 'unknown authority'}}, 404)
+
+        self.send_response(302)
+        self.send_header('Location', f"{payment['callback_url']}?{urlencode({'Authority': authority, 'Status': 'OK'})}")
+        self.send_header('Content-Length', '0')
+        self.end_headers()
@@ -0,0 +1,88 @@
+import asyncio
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import models
+
+RESULT_KEY = 'checkout-key:{}:{}'
+
+
+class DuplicateCheckout(Exception):
+    """این checkout_key قبلاً برای همین کاربر ثبت شده است"""
+
+
+def new_checkout_key():
+    return secrets.token_urlsafe(24)
+
+
+def ttl():
+    return timedelta(hours=settings.CHECKOUT_KEY_TTL_HOURS)
+
+
+async def cached_result(user_id, key):
+    """redirect ذخیره شده از cache؛ ارسال تکراری بدون هیچ کوئری دیتابیس جواب می‌گیرد"""
+    return await cache.aget(RESULT_KEY.format(user_id, key))
+
+
+def find_checkout(user_id, key):
+    """
+    ردیف معتبر (منقضی نشده) این کلید یا None. ردیف منقضی همین‌جا پاک می‌شود تا
+    unique constraint جلوی ثبت دوباره را نگیرد.
+    """
+    checkout = models.CheckoutKey.objects.filter(user_id=user_id, key=key).first()
+    if checkout and checkout.expires_at <= timezone.now():
+        checkout.delete()
+        return None
+    return checkout
+
+
+def claim_checkout(user, key, invoice):
+    """
+    ثبت کلید داخل تراکنش فاکتور فراخواننده؛ اگر درخواست دیگری زودتر همین کلید را
+    ثبت کرده باشد IntegrityError بالا می‌رود و کل تراکنش (فاکتور و رزرو) برمی‌گردد.
+    """
+    return models.CheckoutKey.objects.create(
+        user=user, key=key, invoice=invoice, expires_at=timezone.now() + ttl()
+    )
+
+
+def complete_checkout(checkout, redirect_url):
+    models.CheckoutKey.objects.filter(pk=checkout.pk).update(redirect_url=redirect_url)
+    cache.set(RESULT_KEY.format(checkout.user_id, checkout.key), redirect_url,
+              int(ttl().total_seconds()))
+
+
+def abandon_checkout(checkout):
+    """درخواست پرداخت شکست خورد؛ کلید آزاد می‌شود تا ارسال دوباره فرم از نو انجام شود"""
+    models.CheckoutKey.objects.filter(pk=checkout.pk).delete()
+
+
+async def wait_for_result(user_id, key, timeout=None, poll=0.25):
+    """
+    صبر (بدون اشغال thread) تا درخواست اولِ همین کلید جواب درگاه را بگیرد.
+    خروجی: redirect_url، یا None اگر در این مدت نتیجه‌ای ثبت نشد یا درخواست اول شکست خورد.
+    """
+    timeout = settings.CHECKOUT_KEY_WAIT if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        url = await cached_result(user_id, key)
+        if url:
+            return url
+        checkout = await models.CheckoutKey.objects.filter(user_id=user_id, key=key).only('redirect_url').afirst()
+        if checkout is None:
+            return None
+        if checkout.redirect_url:
+            return checkout.redirect_url
+        if loop.time() >= deadline:
+            return None
+        await asyncio.sleep(poll)
+
+
+def purge_expired_keys():
+    deleted, _ = models.CheckoutKey.objects.filter(expires_at__lt=timezone.now()).delete()
+    return deleted
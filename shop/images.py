@@ -0,0 +1,77 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+# عرض نسخه‌های کوچک‌شده تصویر محصول (پیکسل)
+VARIANT_WIDTHS = (320, 640, 960)
+VARIANT_DIR = 'covers/variants'
+
+# فرمت‌ها به ترتیب اولویت در <picture>
+FORMATS = [
+    ('avif', 'AVIF', {'quality': 50}),
+    ('webp', 'WEBP', {'quality': 75, 'method': 6}),
+    ('jpeg', 'JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+]
+
+
+def available_formats():
+    return [f for f in FORMATS if f[0] == 'jpeg' or features.check(f[0])]
+
+
+def variant_name(source, width, ext, product_id=None):
+    """
+    نام هر نسخه به مسیر کامل source و محصول وابسته است: covers/foo.jpg و covers/foo.png
+    یا دو محصول با یک تصویر هیچ‌وقت فایل‌های هم را بازنویسی یا پاک نمی‌کنند.
+    """
+    stem = os.path.splitext(os.path.basename(source))[0]
+    key = hashlib.sha1(f'{product_id}:{source}'.encode()).hexdigest()[:12]
+    return f"{VARIANT_DIR}/{stem}-{key}-{width}.{'jpg' if ext == 'jpeg' else ext}"
+
+
+def build_variants(source, storage=default_storage, product_id=None):
+    """
+    نسخه‌های thumbnail و WebP/AVIF تصویر source را می‌سازد و در storage ذخیره می‌کند.
+    خروجی dict قابل ذخیره در Product.image_variants است.
+    """
+    with storage.open(source, 'rb') as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    widths = [w for w in VARIANT_WIDTHS if w < image.width] or [image.width]
+    variants = {'source': source, 'width': image.width, 'height': image.height}
+
+    for ext, pil_format, options in available_formats():
+        variants[ext] = {}
+        for width in widths:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            if pil_format == 'JPEG' and resized.mode == 'RGBA':
+                resized = resized.convert('RGB')
+
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+
+            name = variant_name(source, width, ext, product_id)
+            if storage.exists(name):
+                storage.delete(name)
+            variants[ext][str(width)] = storage.save(name, ContentFile(buffer.getvalue()))
+
+    return variants
+
+
+def variant_names(variants):
+    return {name for ext, _, _ in FORMATS for name in (variants or {}).get(ext, {}).values()}
+
+
+def delete_variants(variants, storage=default_storage, keep=None):
+    """فایل‌های variants را پاک می‌کند، به جز آن‌هایی که در keep (نسخه‌های جدید) هم هستند"""
+    for name in variant_names(variants) - variant_names(keep):
+        storage.delete(name)
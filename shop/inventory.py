@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStock(Exception):
+    def __init__(self, product):
+        super().__init__(f'not enough stock for product {product.pk}')
+        self.product = product
+
+
+def reserve_stock(invoice, items, ttl=None):
+    """
+    برای اقلام فاکتور (dict محصول → تعداد) موجودی رزرو می‌کند.
+
+    هر رزرو یک UPDATE شرطی روی یک ردیف محصول است
+    (WHERE count - reserved >= n)، پس خریداران هم‌زمان هرگز بیشتر از موجودی
+    رزرو نمی‌کنند. اگر یکی از محصولات کافی نباشد OutOfStock بالا می‌رود و کل
+    تراکنش (همراه با فاکتور فراخواننده) برمی‌گردد.
+    """
+    ttl = ttl or timedelta(minutes=settings.STOCK_RESERVATION_MINUTES)
+    expires_at = timezone.now() + ttl
+    reservations = []
+
+    with transaction.atomic():
+        # ترتیب ثابت قفل ردیف‌ها تا دو checkout هم‌زمان deadlock نکنند
+        for product, quantity in sorted(items.items(), key=lambda item: item[0].pk):
+            updated = models.Product.objects.filter(
+                pk=product.pk, enabled=True, count__gte=F('reserved') + quantity
+            ).update(reserved=F('reserved') + quantity)
+            if not updated:
+                raise OutOfStock(product)
+            reservations.append(models.StockReservation(
+                invoice=invoice, product=product, quantity=quantity, expires_at=expires_at
+            ))
+        models.StockReservation.objects.bulk_create(reservations)
+
+    return reservations
+
+
+def commit_reservations(invoice):
+    """
+    بعد از تایید پرداخت، موجودی را با UPDATE شرطی (WHERE count >= n) کم می‌کند.
+
+    رزروهایی که در این فاصله منقضی شده‌اند مستقیم از موجودی آزاد کم می‌شوند؛
+    خروجی لیست محصولاتی است که دیگر موجودی نداشتند (نیاز به بررسی/استرداد).
+    """
+    shortages = []
+    now = timezone.now()
+
+    with transaction.atomic():
+        reservations = list(
+            models.StockReservation.objects.select_for_update()
+            .filter(invoice=invoice, status__in=[models.StockReservation.STATUS_ACTIVE,
+                                                 models.StockReservation.STATUS_RELEASED])
+            .order_by('product_id')
+        )
+        for reservation in reservations:
+            quantity = reservation.quantity
+            products = models.Product.objects.filter(pk=reservation.product_id)
+            if reservation.status == models.StockReservation.STATUS_ACTIVE:
+                updated = products.filter(count__gte=quantity).update(
+                    count=F('count') - quantity, reserved=F('reserved') - quantity)
+            else:
+                updated = products.filter(count__gte=F('reserved') + quantity).update(
+                    count=F('count') - quantity)
+            if not updated:
+                shortages.append(reservation.product_id)
+                logger.error('invoice %s paid but product %s is out of stock',
+                             invoice.pk, reservation.product_id)
+                continue
+            reservation.status = models.StockReservation.STATUS_COMMITTED
+            reservation.closed_at = now
+
+        models.StockReservation.objects.bulk_update(reservations, ['status', 'closed_at'])
+
+    return shortages
+
+
+def release_reservations(reservations):
+    """
+    رزروهای فعال را آزاد می‌کند: یک UPDATE روی رزروها و یک UPDATE جمع‌شده
+    برای هر محصول. خروجی: تعداد رزروهای آزاد شده.
+    """
+    with transaction.atomic():
+        ids = list(
+            reservations.select_for_update()
+            .filter(status=models.StockReservation.STATUS_ACTIVE)
+            .values_list('pk', flat=True)
+        )
+        if not ids:
+            return 0
+
+        models.StockReservation.objects.filter(pk__in=ids).update(
+            status=models.StockReservation.STATUS_RELEASED, closed_at=timezone.now())
+        totals = (
+            models.StockReservation.objects.filter(pk__in=ids)
+            .values('product_id')
+            .annotate(total=Sum('quantity'))
+            .order_by('product_id')
+        )
+        for row in totals:
+            models.Product.objects.filter(pk=row['product_id']).update(reserved=F('reserved') - row['total'])
+
+    return len(ids)
+
+
+def release_invoice(invoice):
+    return release_reservations(models.StockReservation.objects.filter(invoice=invoice))
+
+
+def release_expired_reservations(batch_size=500):
+    """sweeper: رزروهای منقضی شده را در batch های batch_size آزاد می‌کند"""
+    released = 0
+    while True:
+        ids = list(
+            models.StockReservation.objects.filter(
+                status=models.StockReservation.STATUS_ACTIVE, expires_at__lt=timezone.now()
+            ).order_by('expires_at').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        released += release_reservations(models.StockReservation.objects.filter(pk__in=ids))
+        if len(ids) < batch_size:
+            break
+    return released
+
+
+def start_release_scheduler(interval):
+    """اجرای دوره‌ای release_expired_reservations در یک thread پس‌زمینه داخل همین process"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                release_expired_reservations()
+            except Exception:
+                logger.exception('stock reservation sweep failed')
+            finally:
+                close_old_connections()
+
+    thread = threading.Thread(target=run, name='stock-reservations', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from shop.models import Product
+from shop.pricing import backfill_effective_prices
+from shop.search import ensure_fts_triggers
+
+
+class Command(BaseCommand):
+    help = 'Recompute Product.effective_price for rows written without Product.save().'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # bulk_update از save و signal ها رد می‌شود؛ ایندکس جستجو فقط به trigger ها تکیه دارد
+        restored = ensure_fts_triggers(connection)
+        if restored:
+            self.stdout.write(f'Restored search triggers: {", ".join(restored)}')
+        changed = backfill_effective_prices(Product, batch_size=options['batch_size'])
+        self.stdout.write(f'{changed} product price(s) updated.')
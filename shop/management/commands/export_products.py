@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from shop.catalog import FIELDS, FORMATS, guess_format, write_rows
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Stream all products to a CSV or JSONL file with constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help="Output file, or '-' for stdout.")
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='Output format (default: from the file extension, else csv).')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--category', default=None,
+                            help='Only export this category id and its subcategories.')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_format(options['output'])
+        products = Product.objects.order_by('pk')
+        if options['category']:
+            products = products.filter(category__ancestor_links__ancestor_id=options['category'])
+
+        columns = [f'{name}__name' if name == 'category' else name for name in FIELDS]
+        rows = (
+            [str(value) if name == 'uuid' else value for name, value in zip(FIELDS, row)]
+            for row in products.values_list(*columns).iterator(chunk_size=options['chunk_size'])
+        )
+
+        output = options['output']
+        if output == '-':
+            write_rows(self.stdout, fmt, rows)
+            return
+        with open(output, 'w', newline='', encoding='utf-8') as file:
+            write_rows(file, fmt, rows)
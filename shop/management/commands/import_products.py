@@ -0,0 +1,133 @@
+import sys
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.fragments import bump_version
+from shop.catalog import FORMATS, RowError, clean_row, guess_format, read_rows
+from shop.models import Category, Product
+from shop.pricing import unit_price
+
+UPDATE_FIELDS = ['name', 'slug', 'category', 'price', 'discount', 'effective_price', 'count', 'enabled',
+                 'description', 'modified_date']
+
+
+class DryRun(Exception):
+    pass
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Create or update products in batches from a CSV or JSONL file (matched by uuid).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV/JSONL file, or '-' for stdin.")
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='Input format (default: from the file extension, else csv).')
+        parser.add_argument('--user', default=None,
+                            help='Username recorded as the creator (default: first superuser).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--create-categories', action='store_true',
+                            help='Create missing categories instead of rejecting their rows.')
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help='Report and skip invalid rows instead of aborting the import.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate and write everything, then roll back.')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_format(options['path'])
+        user = self.get_user(options['user'])
+        self.categories = dict(Category.objects.filter(deleted=False).values_list('name', 'id'))
+        self.create_categories = options['create_categories']
+        self.user = user
+
+        self.errors = []
+        self.imported = 0
+        path = options['path']
+        file = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            # کل import در یک تراکنش: خطا یعنی هیچ ردیفی نوشته نمی‌شود
+            with transaction.atomic():
+                for batch in batches(read_rows(file, fmt), options['batch_size']):
+                    products = self.clean_batch(batch)
+                    if self.errors and not options['skip_invalid']:
+                        raise CommandError(self.format_errors())
+                    self.save_batch(products, options['batch_size'])
+                if options['dry_run']:
+                    raise DryRun
+        except DryRun:
+            self.stdout.write('Dry run: all changes rolled back.')
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+        if self.errors:
+            self.stderr.write(self.format_errors())
+        if not options['dry_run']:
+            # bulk_create سیگنال post_save نمی‌فرستد
+            bump_version('home_products')
+        self.stdout.write(f'{self.imported} product(s) imported, {len(self.errors)} row(s) skipped.')
+
+    def get_user(self, username):
+        User = get_user_model()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'user "{username}" does not exist')
+        user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('no superuser found; pass --user')
+        return user
+
+    def clean_batch(self, batch):
+        products = {}
+        for line_no, row in batch:
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                values = clean_row(row)
+                values['category_id'] = self.category_id(values.pop('category'))
+            except RowError as e:
+                self.errors.append(f'line {line_no}: {e}')
+                continue
+            # uuid تکراری در یک batch: ردیف آخر برنده است
+            products[values['uuid']] = Product(user=self.user, **values)
+        return list(products.values())
+
+    def category_id(self, name):
+        if name not in self.categories:
+            if not self.create_categories:
+                raise RowError(f'unknown category "{name}"')
+            # با create تا signal جدول closure دسته را هم بسازد
+            self.categories[name] = Category.objects.create(name=name, user=self.user).pk
+        return self.categories[name]
+
+    def save_batch(self, products, batch_size):
+        now = timezone.now()
+        for product in products:
+            # bulk_create از Product.save عبور نمی‌کند
+            product.effective_price = unit_price(product.price, product.discount)
+            product.modified_date = now
+        Product.objects.bulk_create(
+            products,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['uuid'],
+            update_fields=UPDATE_FIELDS,
+        )
+        self.imported += len(products)
+
+    def format_errors(self, limit=20):
+        lines = self.errors[:limit]
+        if len(self.errors) > limit:
+            lines.append(f'... and {len(self.errors) - limit} more')
+        return '\n'.join(['Invalid rows:', *lines])
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shop.cart import CART_COOKIE_AGE
+from shop.models import CartLine
+
+
+class Command(BaseCommand):
+    help = 'Delete guest cart lines whose cookie has expired.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=CART_COOKIE_AGE // (24 * 60 * 60),
+                            help='Delete guest lines not touched for this many days.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = CartLine.objects.filter(owner__startswith='anon:', updated_at__lt=cutoff).delete()
+        self.stdout.write(f'{deleted} guest cart line(s) deleted.')
@@ -0,0 +1,61 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shop.images import build_variants, delete_variants
+from shop.models import Product
+
+
+def _build(pk, source):
+    return pk, build_variants(source, product_id=pk)
+
+
+class Command(BaseCommand):
+    help = 'Build thumbnail and WebP/AVIF variants for existing product images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of worker processes (default: CPU count).')
+        parser.add_argument('--force', action='store_true',
+                            help='Rebuild variants even if they are up to date.')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True).only('pk', 'image', 'image_variants')
+        jobs = {
+            p.pk: p for p in products.iterator(chunk_size=500)
+            if options['force'] or (p.image_variants or {}).get('source') != p.image.name
+        }
+        if not jobs:
+            self.stdout.write('All product images are up to date.')
+            return
+
+        # نسخه‌های قدیمی تصویر قبلی پیش از ساخت نسخه‌های جدید پاک می‌شوند
+        for product in jobs.values():
+            old = product.image_variants or {}
+            if old.get('source') != product.image.name:
+                delete_variants(old)
+
+        done = []
+        failed = 0
+        now = timezone.now()
+        # پردازش تصاویر در process های جدا؛ فقط process اصلی به دیتابیس دسترسی دارد
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            futures = [pool.submit(_build, pk, p.image.name) for pk, p in jobs.items()]
+            for future in as_completed(futures):
+                try:
+                    pk, variants = future.result()
+                except OSError as e:
+                    failed += 1
+                    self.stderr.write(f'failed: {e}')
+                    continue
+                product = jobs[pk]
+                # با --force نام‌های قدیمی‌تر (مثلاً با قالب نام‌گذاری قبلی) جا می‌مانند
+                delete_variants(product.image_variants, keep=variants)
+                product.image_variants = variants
+                product.modified_date = now
+                done.append(product)
+
+        Product.objects.bulk_update(done, ['image_variants', 'modified_date'], batch_size=500)
+        self.stdout.write(f'{len(done)} product image(s) rebuilt, {failed} failed.')
@@ -0,0 +1,55 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shop.gateway import ZarinPalClient, gateway_options, metrics
+from shop.gateway_stub import StubGateway
+from shop.reconciliation import reconcile_pending_payments
+
+
+class Command(BaseCommand):
+    help = 'Verify stale pending payments with ZarinPal and record their final status.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=int, default=settings.PAYMENT_RECONCILE_MINUTES,
+                            help='Reconcile pending payments older than this many minutes.')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--workers', type=int, default=settings.ZARINPAL_POOL_SIZE,
+                            help='Concurrent verify calls.')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running and reconcile every N seconds.')
+        parser.add_argument('--stub', choices=['failed', 'paid', 'random'],
+                            help='Verify against a local stub gateway instead of ZarinPal; '
+                                 'the value is the result for every pending payment.')
+        parser.add_argument('--stub-latency', type=float, default=0,
+                            help='Seconds the stub gateway waits before each answer.')
+
+    def handle(self, *args, **options):
+        older_than = timedelta(minutes=options['minutes'])
+        stub = gateway = None
+        if options['stub']:
+            stub = StubGateway(latency=options['stub_latency'], unknown=options['stub'])
+            stub.start()
+            gateway = ZarinPalClient(**{**gateway_options(), 'api_url': stub.url,
+                                        'pool_size': options['workers']})
+            self.stdout.write(f'Using stub gateway at {stub.url}')
+
+        try:
+            while True:
+                started = time.monotonic()
+                summary = reconcile_pending_payments(
+                    older_than, batch_size=options['batch_size'],
+                    workers=options['workers'], gateway=gateway)
+                self.stdout.write(
+                    f"{summary['done']} done, {summary['failed']} failed, "
+                    f"{summary['unknown']} unknown in {time.monotonic() - started:.1f}s "
+                    f"(verify: {metrics.snapshot().get('verify', {})})")
+                if not options['interval']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            if stub:
+                gateway.close()
+                stub.stop()
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.inventory import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Release expired checkout stock reservations back to the products.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running and sweep every N seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_reservations(batch_size=options['batch_size'])
+            self.stdout.write(f'{released} reservation(s) released.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from shop.gateway_stub import StubGateway
+
+
+class Command(BaseCommand):
+    help = ('Run a local ZarinPal REST v4 stub for offline tests and load tests. Point '
+            'ZARINPAL_API_URL at it and ZARINPAL_STARTPAY_URL at <url>/pg/StartPay/.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0,
+                            help='Seconds to wait before answering each API call.')
+        parser.add_argument('--fail-rate', type=float, default=0,
+                            help='Percentage of API calls answered with 503.')
+
+    def handle(self, *args, **options):
+        server = StubGateway((options['host'], options['port']),
+                             latency=options['latency'], fail_rate=options['fail_rate'])
+        self.stdout.write(f'ZarinPal stub listening on {server.url}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,32 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .cart import CART_COOKIE, CART_COOKIE_AGE
+
+
+class CartCookieMiddleware:
+    """کوکی سبد مهمان را فقط وقتی اولین کالا اضافه می‌شود ست می‌کند (CartStore.for_request)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # زیر ASGI بدون جابه‌جایی thread در زنجیره middleware اجرا می‌شود
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.set_cookie(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.set_cookie(request, await self.get_response(request))
+
+    @staticmethod
+    def set_cookie(request, response):
+        token = getattr(request, 'new_cart_token', None)
+        if token:
+            response.set_cookie(CART_COOKIE, token, max_age=CART_COOKIE_AGE, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:54
+
+import django.db.models.deletion
+import shop.search
+from django.db import migrations, models
+
+FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE shop_product_fts USING fts5(
+        name, description,
+        content='shop_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER shop_product_fts_insert AFTER INSERT ON shop_product BEGIN
+        INSERT INTO shop_product_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER shop_product_fts_delete AFTER DELETE ON shop_product BEGIN
+        INSERT INTO shop_product_fts(shop_product_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER shop_product_fts_update AFTER UPDATE OF name, description ON shop_product BEGIN
+        INSERT INTO shop_product_fts(shop_product_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO shop_product_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    "INSERT INTO shop_product_fts(shop_product_fts) VALUES ('rebuild')",
+    # وزن name ده برابر description در رتبه‌بندی
+    "INSERT INTO shop_product_fts(shop_product_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS shop_product_fts_insert',
+    'DROP TRIGGER IF EXISTS shop_product_fts_delete',
+    'DROP TRIGGER IF EXISTS shop_product_fts_update',
+    'DROP TABLE IF EXISTS shop_product_fts',
+]
+
+
+def run_sql(statements):
+    def run(apps, schema_editor):
+        # فقط SQLite؛ backend های دیگر (مثلا tsvector در Postgres) migration خودشان را دارند
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0011_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchIndex',
+            fields=[
+                ('product', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='shop.product')),
+                ('name', models.TextField()),
+                ('description', models.TextField()),
+                ('fts', shop.search.FullTextField(db_column='shop_product_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'shop_product_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(run_sql(FTS_SQL), run_sql(DROP_SQL)),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0013_categoryclosure'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shopcomment',
+            index=models.Index(fields=['product', 'enable', '-created_at', '-id'], name='shop_comment_product_idx'),
+        ),
+    ]
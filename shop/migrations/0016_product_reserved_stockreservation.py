@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from shop.search import restore_fts_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0015_cartline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        # AddField روی SQLite جدول shop_product را از نو می‌سازد و trigger های FTS پاک می‌شوند
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('active', 'رزرو شده'), ('committed', 'فروخته شده'), ('released', 'آزاد شده')], default='active', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='shop.invoice')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='reservations', to='shop.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='stock_reservation_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0016_product_reserved_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'id'], name='shop_payment_status_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+from shop.pricing import backfill_effective_prices
+from shop.search import restore_fts_triggers
+
+
+def backfill(apps, schema_editor):
+    backfill_effective_prices(apps.get_model('shop', 'Product'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0018_checkoutkey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['effective_price', 'id'], name='product_price_idx'),
+        ),
+        # بازسازی جدول shop_product در SQLite trigger های FTS را پاک کرده است؛ قبل از backfill برمی‌گردند
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:15
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_invoices(apps, schema_editor):
+    # فاکتورهای قدیمی همان شماره‌ای را می‌گیرند که تا حالا نمایش داده می‌شد (#id)
+    # و شمارنده بعد از بزرگ‌ترین id شروع می‌شود تا شماره‌ی جدید با آن‌ها تداخل نکند
+    Invoice = apps.get_model('shop', 'Invoice')
+    NumberSequence = apps.get_model('shop', 'NumberSequence')
+    Invoice.objects.filter(number__isnull=True).update(number=F('id'))
+    last = Invoice.objects.aggregate(last=Max('number'))['last'] or 0
+    NumberSequence.objects.create(name='invoice', next_value=max(settings.INVOICE_NUMBER_START, last + 1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0019_product_effective_price_product_product_price_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(number_invoices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='invoice',
+            name='number',
+            field=models.IntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
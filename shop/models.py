@@ -1,5 +1,8 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.text import slugify
+from .pricing import unit_price
+from .search import FullTextField
 import uuid
 # -------------------------------
 # from django.contrib.auth.models import User
@@ -29,21 +32,63 @@ class Product(Base):
     slug = models.SlugField()
     price = models.IntegerField(default=0)
     discount = models.FloatField(default=0)
+    # قیمت بعد از تخفیف (shop.pricing.unit_price)؛ در save به‌روز می‌شود تا مرتب‌سازی و
+    # فیلتر بازه قیمت در SQL انجام شود. داده‌های قدیمی: python manage.py backfill_prices
+    effective_price = models.IntegerField(default=0, editable=False)
     enabled = models.BooleanField(default=True)
     description = models.TextField()
     image = models.ImageField(upload_to='covers/', null=True, blank=True)
+    # نسخه‌های thumbnail/WebP/AVIF تصویر (shop.images.build_variants)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     category = models.ForeignKey(
         'Category',
         on_delete=models.PROTECT,
         related_name='products'
     )
     count = models.IntegerField(default=0)
+    # جمع رزروهای فعال checkout (shop.inventory)؛ موجودی قابل فروش = count - reserved
+    reserved = models.PositiveIntegerField(default=0, editable=False)
 
     # 🔥 حذف ManyToManyField
     # comments = models.ManyToManyField('ShopComment')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-create_date', '-id'], name='product_list_idx'),
+            models.Index(fields=['effective_price', 'id'], name='product_price_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_count = instance.__dict__.get('count')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.effective_price = unit_price(self.price, self.discount)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'price', 'discount'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'effective_price'}
+        elif update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # reserved (و count اگر در این نمونه تغییر نکرده) با UPDATE های F() در shop.inventory
+            # عوض می‌شوند؛ save کامل (ادمین، داشبورد) مقدار کهنه حافظه را روی رزرو/فروش
+            # هم‌زمان نمی‌نویسد
+            skip = {'reserved'} | self.get_deferred_fields()
+            if self.count == getattr(self, '_loaded_count', None):
+                skip.add('count')
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skip and field.attname not in skip
+            ]
+        super().save(*args, **kwargs)
+        self._loaded_count = self.__dict__.get('count')
+
+    @property
+    def available(self):
+        return self.count - self.reserved
 # class Product(Base):
 #     # ------------------------------------------------
 #     # STATUS_ENABLED = 0
@@ -75,6 +120,23 @@ class Product(Base):
 
 
 
+class ProductSearchIndex(models.Model):
+    """
+    جدول مجازی FTS5 روی name/description محصولات (فقط SQLite).
+    جدول و trigger های همگام‌سازی در migration ساخته می‌شوند؛ rowid همان id محصول است.
+    """
+    product = models.OneToOneField(Product, on_delete=models.DO_NOTHING, primary_key=True,
+                                   db_column='rowid', related_name='search_index')
+    name = models.TextField()
+    description = models.TextField()
+    fts = FullTextField(db_column='shop_product_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'shop_product_fts'
+
+
 class ShopComment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='shop_comment')
     product = models.ForeignKey(
@@ -87,6 +149,12 @@ class ShopComment(models.Model):
     text = models.TextField()
     enable = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # نظرات تایید شده هر محصول به ترتیب جدیدترین (صفحه‌بندی cursor)
+            models.Index(fields=['product', 'enable', '-created_at', '-id'], name='shop_comment_product_idx'),
+        ]
+
     def __str__(self):
         return f"{self.text}"
 # class ShopComment(models.Model):
@@ -112,6 +180,39 @@ class Category(Base):
     def __str__(self):
         return f"{self.name}"
 
+    def clean(self):
+        if self.pk and self.parent_id and self.is_ancestor_of(self.parent_id):
+            raise ValidationError({'parent': 'دسته‌بندی نمی‌تواند زیرمجموعه خودش یا فرزندانش باشد.'})
+
+    def is_ancestor_of(self, category_id):
+        """بررسی O(1) با یک lookup روی ایندکس CategoryClosure (خودش هم حساب می‌شود)"""
+        return CategoryClosure.objects.filter(ancestor_id=self.pk, descendant_id=category_id).exists()
+
+    def get_ancestors(self):
+        """مسیر از ریشه تا خود دسته (برای breadcrumb) با یک کوئری"""
+        return Category.objects.filter(descendant_links__descendant=self).order_by('-descendant_links__depth')
+
+
+class CategoryClosure(models.Model):
+    """
+    جدول closure درخت دسته‌بندی: برای هر دسته یک ردیف به ازای هر جد (و خودش با depth=0).
+    با signal های shop.signals روی ذخیره/جابجایی دسته‌ها به‌روز می‌شود.
+    """
+    ancestor = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='category_closure_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='category_closure_path_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
 
 class InvoiceItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
@@ -125,7 +226,8 @@ class InvoiceItem(models.Model):
 
 class Invoice(models.Model):
     date = models.DateTimeField(auto_now_add=True)
-    number = models.IntegerField(null=True, blank=True)
+    # شماره فاکتور برای کاربر (shop.numbering)؛ یکتا و ایندکس‌دار برای جستجوی دقیق
+    number = models.IntegerField(null=True, blank=True, unique=True, editable=False)
     user = models.ForeignKey(User, on_delete=models.PROTECT)
     total = models.IntegerField()
     discount = models.FloatField(default=0)
@@ -137,6 +239,55 @@ class Invoice(models.Model):
         return f"{self.user.username} - Invoice={self.id}"
 
 
+class CartLine(models.Model):
+    """
+    یک ردیف سبد خرید؛ owner برای کاربر وارد شده 'user:<pk>' و برای مهمان
+    'anon:<token>' (کوکی cart) است. تغییر سبد فقط همین ردیف را می‌نویسد، نه کل session.
+    """
+    owner = models.CharField(max_length=64)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'product'], name='cart_line_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['updated_at'], name='cart_line_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} - {self.product_id} x{self.count}"
+
+
+class StockReservation(models.Model):
+    STATUS_ACTIVE = 'active'
+    STATUS_COMMITTED = 'committed'
+    STATUS_RELEASED = 'released'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, 'رزرو شده'),
+        (STATUS_COMMITTED, 'فروخته شده'),
+        (STATUS_RELEASED, 'آزاد شده'),
+    ]
+
+    invoice = models.ForeignKey('Invoice', on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    closed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='stock_reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for invoice {self.invoice_id} ({self.status})"
+
+
 class Payment(models.Model):
     STATUS_PENDING = 'pending'
     STATUS_DONE = 'done'
@@ -154,8 +305,51 @@ class Payment(models.Model):
     description = models.TextField()
     user_ip = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # پرداخت‌های pending برای reconcile_payments
+            models.Index(fields=['status', 'id'], name='shop_payment_status_idx'),
+        ]
+
     def __str__(self):
         return f"({self.invoice.user.username}), invoice {self.invoice.id}"
 
 
+class CheckoutKey(models.Model):
+    """
+    کلید idempotency فرم checkout (فیلد پنهان checkout_key) و نتیجه‌اش. ارسال
+    دوباره همان فرم (دابل‌کلیک، retry مرورگر) به جای فاکتور و Payment جدید همان
+    redirect درگاه را برمی‌گرداند. redirect_url خالی یعنی درخواست اول هنوز در جریان است.
+    """
+    key = models.CharField(max_length=64)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='+')
+    redirect_url = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='checkout_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='checkout_key_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.key}"
+
+
+class NumberSequence(models.Model):
+    """
+    شمارنده شماره‌های قابل نمایش (مثلاً شماره فاکتور). هر process بازه‌ای از
+    شماره‌ها را یک‌جا رزرو می‌کند (shop.numbering) پس هر checkout این ردیف را قفل نمی‌کند.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
 
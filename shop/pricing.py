@@ -0,0 +1,59 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.utils import timezone
+
+# همه مبالغ به تومان و عدد صحیح هستند؛ گرد کردن فقط همین‌جا و همیشه half-up انجام می‌شود
+ONE = Decimal(1)
+HUNDRED = Decimal(100)
+
+
+def to_money(value):
+    return int(Decimal(str(value)).quantize(ONE, rounding=ROUND_HALF_UP))
+
+
+def unit_price(price, discount):
+    """قیمت نهایی یک عدد محصول بعد از تخفیف درصدی (همان Product.effective_price)"""
+    if not discount:
+        return int(price)
+    return to_money(Decimal(int(price)) * (HUNDRED - Decimal(str(discount))) / HUNDRED)
+
+
+def line_total(price, discount, count):
+    return unit_price(price, discount) * count
+
+
+def vat_amount(total, rate):
+    return to_money(Decimal(int(total)) * Decimal(str(rate)))
+
+
+def backfill_effective_prices(product_model, batch_size=1000):
+    """
+    effective_price همه محصولات را با unit_price دوباره حساب می‌کند (برای ردیف‌هایی
+    که بدون save نوشته شده‌اند) و فقط ردیف‌های تغییر کرده را با bulk_update می‌نویسد.
+    product_model تا در migration هم مدل تاریخی پاس داده شود. خروجی: تعداد تغییرها.
+    """
+    changed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            product_model.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'price', 'discount', 'effective_price')[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        now = timezone.now()
+        stale = []
+        for product in batch:
+            value = unit_price(product.price, product.discount)
+            if value != product.effective_price:
+                # modified_date هم عوض می‌شود تا ETag صفحات محصول باطل شود
+                product.effective_price, product.modified_date = value, now
+                stale.append(product)
+        product_model.objects.bulk_update(stale, ['effective_price', 'modified_date'])
+        changed += len(stale)
+
+        if len(batch) < batch_size:
+            break
+    return changed
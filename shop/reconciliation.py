@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import models
+from .gateway import GatewayError, get_gateway
+from .inventory import commit_reservations, release_invoice
+
+logger = logging.getLogger(__name__)
+
+# کدهای verify که یعنی این پرداخت قطعاً انجام نشده (نه خطای موقت درگاه)
+FAILED_CODES = {-50, -51, -53, -54, -55}
+
+
+def verify_outcome(gateway, payment):
+    """
+    نتیجه verify یک پرداخت: ('done', ref_id)، ('failed', None) یا ('unknown', None)
+    برای خطای شبکه/درگاه که باید در اجرای بعدی دوباره بررسی شود.
+    """
+    if not payment.authority:
+        # درخواست پرداخت هیچ‌وقت به درگاه نرسید
+        return 'failed', None
+    try:
+        data = gateway.verify(amount=round(payment.total), authority=payment.authority)
+    except GatewayError as e:
+        logger.warning('payment %s: %s', payment.pk, e)
+        return 'unknown', None
+
+    result = data.get('data') or {}
+    if result.get('code') in (100, 101):
+        return 'done', str(result.get('ref_id') or payment.ref or '')
+    errors = data.get('errors') or {}
+    if isinstance(errors, dict) and errors.get('code') in FAILED_CODES:
+        return 'failed', None
+    return 'unknown', None
+
+
+def finalize_payment(payment, status, ref=None):
+    """
+    pending → done/error با UPDATE شرطی (WHERE status='pending'). فقط فراخوانی‌ای که
+    ردیف را واقعاً تغییر داده موجودی را کم یا آزاد می‌کند، پس VerifyView و reconcile
+    هم‌زمان یک پرداخت را دو بار نهایی نمی‌کنند. خروجی: آیا همین فراخوانی نهایی کرد.
+    """
+    fields = {'status': status}
+    if ref is not None:
+        fields['ref'] = ref
+    with transaction.atomic():
+        updated = models.Payment.objects.filter(
+            pk=payment.pk, status=models.Payment.STATUS_PENDING).update(**fields)
+        if updated:
+            if status == models.Payment.STATUS_DONE:
+                commit_reservations(payment.invoice)
+            else:
+                release_invoice(payment.invoice)
+    if updated:
+        for name, value in fields.items():
+            setattr(payment, name, value)
+    return bool(updated)
+
+
+def reconcile_pending_payments(older_than, batch_size=100, workers=None, gateway=None):
+    """
+    پرداخت‌های pending قدیمی‌تر از older_than (کاربر قبل از بازگشت به VerifyView
+    صفحه را بسته) را با verify درگاه تعیین وضعیت می‌کند.
+
+    هر batch با یک pool محدود از thread ها روی Session مشترک کلاینت درگاه verify
+    می‌شود و هر پرداخت با finalize_payment (UPDATE شرطی) نهایی و موجودی رزرو شده
+    کم یا آزاد می‌شود. پرداخت‌هایی که درگاه جواب قطعی نداد pending می‌مانند.
+    خروجی: Counter با کلیدهای done/failed/unknown و skipped (نهایی شده توسط VerifyView).
+    """
+    gateway = gateway or get_gateway()
+    workers = workers or settings.ZARINPAL_POOL_SIZE
+    cutoff = timezone.now() - older_than
+    summary = Counter()
+    last_pk = 0
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reconcile') as pool:
+        while True:
+            batch = list(
+                models.Payment.objects.select_related('invoice')
+                .filter(status=models.Payment.STATUS_PENDING, invoice__date__lt=cutoff, pk__gt=last_pk)
+                .order_by('pk')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            outcomes = pool.map(lambda payment: verify_outcome(gateway, payment), batch)
+            for payment, (outcome, ref) in zip(batch, outcomes):
+                if outcome == 'done':
+                    finalized = finalize_payment(payment, models.Payment.STATUS_DONE, ref)
+                elif outcome == 'failed':
+                    finalized = finalize_payment(payment, models.Payment.STATUS_ERROR)
+                else:
+                    finalized = True
+                # VerifyView همین پرداخت را زودتر نهایی کرده است
+                summary[outcome if finalized else 'skipped'] += 1
+
+            if len(batch) < batch_size:
+                break
+
+    logger.info('payment reconciliation: %d done, %d failed, %d unknown, %d skipped',
+                summary['done'], summary['failed'], summary['unknown'], summary['skipped'])
+    return summary
+
+
+def start_reconcile_scheduler(interval, older_than):
+    """اجرای دوره‌ای reconcile_pending_payments در یک thread پس‌زمینه داخل همین process"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                reconcile_pending_payments(older_than)
+            except Exception:
+                logger.exception('payment reconciliation failed')
+            finally:
+                close_old_connections()
+
+    thread = threading.Thread(target=run, name='payment-reconcile', daemon=True)
+    thread.start()
+    return thread
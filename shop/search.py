@@ -0,0 +1,152 @@
+import logging
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import models
+from django.db.models import F, Q, Value
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+')
+
+FTS_TABLE = 'shop_product_fts'
+
+# trigger های همگام‌سازی shop_product_fts (همان migration 0012). SQLite موقع بازسازی
+# جدول shop_product (AddField/AlterField) این trigger ها را پاک می‌کند، پس بعد از هر
+# migrate با ensure_fts_triggers دوباره ساخته می‌شوند.
+FTS_TRIGGERS = {
+    'shop_product_fts_insert': """
+        CREATE TRIGGER IF NOT EXISTS shop_product_fts_insert AFTER INSERT ON shop_product BEGIN
+            INSERT INTO shop_product_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+    'shop_product_fts_delete': """
+        CREATE TRIGGER IF NOT EXISTS shop_product_fts_delete AFTER DELETE ON shop_product BEGIN
+            INSERT INTO shop_product_fts(shop_product_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    """,
+    'shop_product_fts_update': """
+        CREATE TRIGGER IF NOT EXISTS shop_product_fts_update AFTER UPDATE OF name, description ON shop_product BEGIN
+            INSERT INTO shop_product_fts(shop_product_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO shop_product_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+}
+
+
+class FullTextField(models.Field):
+    """
+    ستون پنهان هم‌نام جدول FTS5؛ فقط برای lookup match استفاده می‌شود:
+    "shop_product_fts"."shop_product_fts" MATCH '...'
+    """
+
+    def db_type(self, connection):
+        return None
+
+
+@FullTextField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', (*lhs_params, *rhs_params)
+
+
+class SearchBackend:
+    """
+    رابط جستجوی محصولات. search باید queryset را فیلتر کند و ستون search_score
+    (بزرگ‌تر = مرتبط‌تر) را به آن اضافه کند تا بتوان بر اساس آن مرتب/صفحه‌بندی کرد.
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    @staticmethod
+    def tokens(query):
+        return TOKEN_RE.findall(query or '')
+
+    @staticmethod
+    def empty(queryset):
+        # عبارت بدون کلمه (مثلاً فقط علامت): نتیجه خالی ولی با search_score تا order_by آن خطا ندهد
+        return queryset.none().annotate(search_score=Value(0.0))
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    جستجو روی جدول مجازی FTS5 (shop_product_fts) که با trigger های دیتابیس
+    همگام نگه داشته می‌شود. رتبه‌بندی bm25 با وزن بیشتر برای name است.
+    """
+
+    def search(self, queryset, query):
+        tokens = self.tokens(query)
+        if not tokens:
+            return self.empty(queryset)
+        # هر کلمه به صورت prefix و داخل "" تا عملگرهای FTS5 از ورودی کاربر اجرا نشوند
+        expression = ' '.join(f'"{token}"*' for token in tokens)
+        return queryset.filter(search_index__fts__match=expression).annotate(
+            search_score=-F('search_index__rank')
+        )
+
+
+class ContainsBackend(SearchBackend):
+    """جستجوی ساده icontains برای دیتابیس‌هایی که هنوز backend اختصاصی ندارند"""
+
+    def search(self, queryset, query):
+        tokens = self.tokens(query)
+        if not tokens:
+            return self.empty(queryset)
+        for token in tokens:
+            queryset = queryset.filter(Q(name__icontains=token) | Q(description__icontains=token))
+        return queryset.annotate(search_score=Value(0.0))
+
+
+@lru_cache
+def get_search_backend():
+    return import_string(settings.PRODUCT_SEARCH_BACKEND)()
+
+
+def search_products(queryset, query):
+    return get_search_backend().search(queryset, query)
+
+
+def ensure_fts_triggers(connection):
+    """
+    trigger های گم‌شده FTS را (idempotent) می‌سازد و در آن صورت ایندکس را rebuild
+    می‌کند تا محصولاتی که در این فاصله ساخته/ویرایش شده‌اند هم جستجو شوند.
+    خروجی: نام trigger های ساخته شده.
+    """
+    if connection.vendor != 'sqlite':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name, type FROM sqlite_master WHERE name LIKE 'shop_product_fts%%'")
+        existing = dict(cursor.fetchall())
+        if existing.get(FTS_TABLE) != 'table':
+            # migration 0012 هنوز اجرا نشده است
+            return []
+        missing = [name for name in FTS_TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(FTS_TRIGGERS[name])
+        if missing:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return missing
+
+
+def restore_fts_triggers(apps, schema_editor):
+    """RunPython برای migration هایی که جدول shop_product را بازسازی می‌کنند"""
+    ensure_fts_triggers(schema_editor.connection)
+
+
+def search_post_migrate(sender, using, **kwargs):
+    from django.db import connections
+
+    restored = ensure_fts_triggers(connections[using])
+    if restored:
+        logger.warning('restored product search triggers: %s', ', '.join(restored))
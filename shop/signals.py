@@ -0,0 +1,114 @@
+import logging
+
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.fragments import bump_version
+
+from . import models
+from .cart import CART_COOKIE, CartStore
+from .images import build_variants, delete_variants
+from .numbering import next_invoice_number
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=models.Product)
+def product_image_variants(sender, instance, **kwargs):
+    source = instance.image.name or None
+    variants = instance.image_variants or {}
+    if variants.get('source') == source:
+        return
+
+    delete_variants(variants)
+    variants = {}
+    if source:
+        try:
+            variants = build_variants(source, product_id=instance.pk)
+        except OSError:
+            logger.exception('could not build image variants for product %s', instance.pk)
+
+    instance.image_variants = variants
+    # modified_date هم جلو می‌رود تا ETag صفحات محصول عوض شود
+    instance.modified_date = timezone.now()
+    sender.objects.filter(pk=instance.pk).update(image_variants=variants,
+                                                 modified_date=instance.modified_date)
+
+
+@receiver(post_delete, sender=models.Product)
+def product_image_variants_deleted(sender, instance, **kwargs):
+    delete_variants(instance.image_variants)
+
+
+def link_category(category):
+    """ردیف‌های closure یک دسته تازه: خودش + همه اجداد parent"""
+    links = [models.CategoryClosure(ancestor_id=category.pk, descendant_id=category.pk, depth=0)]
+    if category.parent_id:
+        links += [
+            models.CategoryClosure(ancestor_id=ancestor, descendant_id=category.pk, depth=depth + 1)
+            for ancestor, depth in models.CategoryClosure.objects.filter(
+                descendant_id=category.parent_id).values_list('ancestor_id', 'depth')
+        ]
+    models.CategoryClosure.objects.bulk_create(links)
+
+
+def move_category(category):
+    """جابجایی کل زیردرخت category زیر parent جدید با یک DELETE و یک bulk INSERT"""
+    subtree = list(models.CategoryClosure.objects.filter(
+        ancestor_id=category.pk).values_list('descendant_id', 'depth'))
+    subtree_ids = [pk for pk, _ in subtree]
+
+    models.CategoryClosure.objects.filter(descendant_id__in=subtree_ids).exclude(
+        ancestor_id__in=subtree_ids).delete()
+
+    if category.parent_id:
+        ancestors = models.CategoryClosure.objects.filter(
+            descendant_id=category.parent_id).values_list('ancestor_id', 'depth')
+        models.CategoryClosure.objects.bulk_create([
+            models.CategoryClosure(ancestor_id=ancestor, descendant_id=pk, depth=depth + sub_depth + 1)
+            for ancestor, depth in ancestors
+            for pk, sub_depth in subtree
+        ])
+
+
+@receiver(pre_save, sender=models.Invoice)
+def invoice_number(sender, instance, **kwargs):
+    # checkout شماره را پیش از تراکنش خودش می‌گیرد؛ این برای فاکتورهای ساخته شده از جاهای دیگر است
+    if instance.number is None:
+        instance.number = next_invoice_number()
+
+
+@receiver(pre_save, sender=models.Category)
+def category_parent_changing(sender, instance, **kwargs):
+    instance._old_parent_id = None
+    if instance.pk is None:
+        return
+    instance._old_parent_id = sender.objects.filter(pk=instance.pk).values_list('parent_id', flat=True).first()
+    if instance.parent_id != instance._old_parent_id and instance.parent_id \
+            and instance.is_ancestor_of(instance.parent_id):
+        raise ValueError('category cannot be moved under itself or its descendants')
+
+
+@receiver(post_save, sender=models.Category)
+def category_closure(sender, instance, created, **kwargs):
+    with transaction.atomic():
+        if created:
+            link_category(instance)
+        elif instance.parent_id != getattr(instance, '_old_parent_id', instance.parent_id):
+            move_category(instance)
+    transaction.on_commit(lambda: bump_version('categories'))
+
+
+@receiver(post_delete, sender=models.Category)
+def category_deleted(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version('categories'))
+
+
+@receiver(user_logged_in)
+def merge_guest_cart(sender, request, user, **kwargs):
+    token = request.COOKIES.get(CART_COOKIE) if request is not None else None
+    if token:
+        CartStore.for_guest(token).merge_into(CartStore.for_user(user))
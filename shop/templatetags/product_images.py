@@ -0,0 +1,46 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+
+def _srcset(names):
+    return ', '.join(
+        f"{default_storage.url(name)} {width}w"
+        for width, name in sorted(names.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.simple_tag
+def product_picture(product, css_class='', sizes='100vw', alt=None):
+    """
+    تصویر محصول را به صورت <picture> با srcset نسخه‌های AVIF/WebP/JPEG
+    و loading="lazy" رندر می‌کند. اگر نسخه‌ای ساخته نشده باشد، همان تصویر اصلی.
+    """
+    if not product.image:
+        return ''
+
+    alt = product.name if alt is None else alt
+    variants = product.image_variants or {}
+    if variants.get('source') != product.image.name or not variants.get('jpeg'):
+        return format_html('<img src="{}" class="{}" alt="{}" loading="lazy" decoding="async">',
+                           product.image.url, css_class, alt)
+
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((MIME_TYPES[ext], _srcset(variants[ext]), sizes)
+         for ext in ('avif', 'webp') if variants.get(ext))
+    )
+    jpeg = variants['jpeg']
+    largest = max(jpeg, key=int)
+    width = int(largest)
+    height = round(variants['height'] * width / variants['width'])
+    img = format_html(
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" class="{}" alt="{}" '
+        'loading="lazy" decoding="async">',
+        default_storage.url(jpeg[largest]), _srcset(jpeg), sizes, width, height, css_class, alt
+    )
+    return format_html('<picture style="display: contents">{}{}</picture>', sources, img)
@@ -1,3 +1,64 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from . import models
+from .inventory import commit_reservations, reserve_stock
+from .search import search_products
+
+
+class SearchTests(TestCase):
+    def test_punctuation_only_query_is_empty_with_score(self):
+        results = search_products(models.Product.objects.all(), '-"!')
+        self.assertEqual(list(results.order_by('-search_score', '-id')), [])
+
+    def test_punctuation_only_query_pages(self):
+        for q in ('-', '"', '!!', '*'):
+            with self.subTest(q=q):
+                self.assertEqual(self.client.get('/shop/', {'q': q}).status_code, 200)
+
+    def test_punctuation_only_dashboard_search(self):
+        admin = get_user_model().objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get('/dashboard/products/', {'search': '!!'}).status_code, 200)
+
+
+class ProductSaveTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='buyer', email='buyer@example.com')
+        category = models.Category.objects.create(name='gold', user=self.user)
+        self.product = models.Product.objects.create(
+            name='gold', slug='gold', price=1000, description='-', category=category,
+            user=self.user, count=10)
+
+    def reserve(self, quantity):
+        invoice = models.Invoice.objects.create(user=self.user, total=0, battle_tag='x')
+        reserve_stock(invoice, {self.product: quantity})
+        return invoice
+
+    def test_full_save_keeps_concurrent_reservation(self):
+        loaded = models.Product.objects.get(pk=self.product.pk)
+        self.reserve(3)
+        loaded.enabled = False
+        loaded.save()
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.reserved, self.product.count, self.product.enabled), (3, 10, False))
+
+    def test_full_save_keeps_concurrent_sale(self):
+        loaded = models.Product.objects.get(pk=self.product.pk)
+        commit_reservations(self.reserve(4))
+        loaded.price = 2000
+        loaded.save()
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.reserved, self.product.count), (0, 6))
+        self.assertEqual(self.product.effective_price, 2000)
+
+    def test_edited_count_is_written(self):
+        loaded = models.Product.objects.get(pk=self.product.pk)
+        self.reserve(2)
+        loaded.count = 20
+        loaded.save()
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.reserved, self.product.count), (2, 20))
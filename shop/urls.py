@@ -5,10 +5,12 @@ app_name = 'shop'
 urlpatterns = [
     path('', views.ListProducts.as_view(), name='product_list'),
     path('product/<int:id>', views.ProductDetailView.as_view(), name='product_detail'),
+    path('product/<int:id>/comments', views.ProductCommentsView.as_view(), name='product_comments'),
     path('cart/add/<int:id>', views.AddToCartView.as_view(), name='cart_add'),
     path('cart/remove/<int:id>', views.RemoveFromCartView.as_view(), name='cart_remove'),
     path('cart/empty', views.EmptyCartView.as_view(), name='cart_empty'),
     path('cart/', views.ShowCartView.as_view(), name='cart_show'),
+    path('cart/batch', views.CartBatchView.as_view(), name='cart_batch'),
     path('checkout/', views.CheckoutView.as_view(), name='checkout'),
     path('verify/', views.VerifyView.as_view(), name='verify'),
     path('cart/decrease/<int:id>', views.DecreaseFromCartView.as_view(), name='cart_decrease'),
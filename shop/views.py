@@ -7,13 +7,29 @@ from django.urls import reverse
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse, HttpResponse, HttpResponseForbidden
 from . import forms
-import requests
-from django.contrib.auth.mixins import LoginRequiredMixin
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
 from rest_framework.views import APIView
 # from zeep import Client
 from django.contrib.sites.shortcuts import get_current_site
 from rest_framework.response import Response
-from django.core.paginator import Paginator
+from django.db.models import Count, Max, Q, Sum
+from django.utils.decorators import method_decorator
+from core.conditional import conditional_get, scalar_subquery
+from core.pagination import KeysetPaginator
+from .cart import Cart, CartError, CartStore
+from .gateway import GatewayError, get_async_gateway
+from .idempotency import (DuplicateCheckout, abandon_checkout, cached_result, claim_checkout,
+                          complete_checkout, find_checkout, new_checkout_key, wait_for_result)
+from .inventory import OutOfStock, release_invoice, release_reservations, reserve_stock
+from django.db import IntegrityError, transaction
+from .numbering import next_invoice_number
+from .pricing import to_money
+from .reconciliation import FAILED_CODES, finalize_payment
+from .search import search_products
+from django.utils.dateformat import format as date_format
+from django.utils.timezone import localtime
 
 
 # Create your views here.
@@ -23,64 +39,148 @@ ZP_API_REQUEST = "https://sandbox.zarinpal.com/pg/rest/WebGate/PaymentRequest.js
 ZP_API_VERIFY = "https://sandbox.zarinpal.com/pg/rest/WebGate/PaymentVerification.json"
 ZP_API_STARTPAY = "https://sandbox.zarinpal.com/pg/StartPay/"
 
+# تعداد نظرات در هر صفحه جزئیات محصول / endpoint نظرات
+COMMENTS_PER_PAGE = 10
 
 
-def get_cart_total_price(cart):
-    total = 0
-    objects = models.Product.objects.filter(id__in=list(cart.keys()))
-    for id,count in cart.items():
-        obj = objects.get(id=id)
-        total += obj.price * count * (1 - obj.discount / 100)
-    return total
-
 
 def get_cart(request):
-    cart = request.session.get('cart', {})
-    if not cart or not isinstance (cart, dict):
-        cart = {}
-    return cart
-
-
-def add_to_cart(cart, obj):
-    if obj.count > 0 and obj.enabled:
-        cart[obj.id] = cart.get(str(obj.id), 0) + 1
-
-
-def remove_from_cart(cart, id):
-    if str(id) in cart:
-        del cart[str(id)]
-
-
+    return CartStore.for_request(request).as_dict()
+
+
+def filter_products(request):
+    obj = models.Product.objects.all()
+
+    # فیلتر بر اساس دسته‌بندی
+    category = request.GET.get('category')
+    # دسته انتخاب شده و همه زیردسته‌هایش (یک join روی جدول closure)
+    if category:
+        obj = obj.filter(category__ancestor_links__ancestor_id=category)
+
+    # جستجوی متنی (shop.search)؛ نتایج بر اساس search_score مرتب می‌شوند
+    q = request.GET.get('q', '').strip()
+    if q:
+        obj = search_products(obj, q)
+
+    # بازه قیمت نهایی (بعد از تخفیف) روی ستون ایندکس‌دار effective_price
+    min_price = price_param(request, 'min_price')
+    if min_price is not None:
+        obj = obj.filter(effective_price__gte=min_price)
+    max_price = price_param(request, 'max_price')
+    if max_price is not None:
+        obj = obj.filter(effective_price__lte=max_price)
+    return obj
+
+
+def price_param(request, name):
+    try:
+        return max(int(request.GET[name]), 0)
+    except (KeyError, ValueError):
+        return None
+
+
+# ?sort= → (ستون cursor، نزولی؟)؛ پیش‌فرض جدیدترین محصولات
+PRODUCT_SORTS = {
+    'price': ('effective_price', False),
+    '-price': ('effective_price', True),
+}
+
+
+def product_list_state(request):
+    # محصولات فیلتر شده و دسته‌بندی‌های سایدبار در یک کوئری aggregate
+    products = filter_products(request)
+    state = models.Category.objects.aggregate(
+        category_count=Count('id'),
+        categories_modified=Max('modified_date'),
+        product_count=Max(scalar_subquery(products, Count('id'))),
+        products_modified=Max(scalar_subquery(products, Max('modified_date'))),
+    )
+    last_modified = max(filter(None, [state['categories_modified'], state['products_modified']]), default=None)
+    # تعداد محصولات هدر صفحه از همین کوئری؛ ListProducts دوباره COUNT نمی‌گیرد
+    request.product_count = state['product_count'] or 0
+    return last_modified, sorted(state.items())
+
+
+def product_detail_state(request, id):
+    approved = Q(comments__enable=True)
+    state = models.Product.objects.filter(id=id).aggregate(
+        modified=Max('modified_date'),
+        comment_count=Count('comments'),
+        approved_count=Count('comments', filter=approved),
+        approved_ids=Sum('comments__id', filter=approved),
+        commented=Max('comments__created_at'),
+        # breadcrumb: اجداد دسته محصول
+        path_modified=Max(scalar_subquery(
+            models.Category.objects.filter(descendant_links__descendant__products=id),
+            Max('modified_date'),
+        )),
+    )
+    if state['modified'] is None:
+        return None
+    last_modified = max(filter(None, [state['modified'], state['commented'], state['path_modified']]))
+    return last_modified, sorted(state.items())
+
+
+def approved_comments(product_id):
+    comments = models.ShopComment.objects.filter(product_id=product_id, enable=True).select_related('user')
+    return KeysetPaginator(comments, COMMENTS_PER_PAGE)
+
+
+@method_decorator(conditional_get(product_list_state), name='get')
 class ListProducts(View):
     def get(self, request):
-        obj = models.Product.objects.all().order_by('-create_date')
-
-        # فیلتر بر اساس دسته‌بندی
+        obj = filter_products(request)
         category = request.GET.get('category')
-        if category:
-            obj = obj.filter(category_id=category)
+        q = request.GET.get('q', '').strip()
+
+        sort = request.GET.get('sort', '')
+        if sort in PRODUCT_SORTS:
+            field, descending = PRODUCT_SORTS[sort]
+        else:
+            sort = ''
+            field, descending = ('search_score' if q else 'create_date'), True
 
-        # Pagination
-        paginator = Paginator(obj, 3)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        # Pagination (cursor)
+        paginator = KeysetPaginator(obj, 3, date_field=field, descending=descending)
+        page_obj = paginator.get_page(request.GET)
 
         # ارسال دسته‌بندی‌ها به قالب
         categories = models.Category.objects.all()
+        breadcrumbs = []
+        if category:
+            breadcrumbs = models.Category.objects.filter(
+                descendant_links__descendant_id=category).order_by('-descendant_links__depth')
+
+        # در حالت عادی product_list_state این عدد را حساب کرده است
+        product_count = getattr(request, 'product_count', None)
+        if product_count is None:
+            product_count = obj.count()
 
         return render(request, 'core/product_list.html', {
             'page_obj': page_obj,
             'products': obj,
+            'product_count': product_count,
             'categories': categories,
-            'selected_category': category
+            'selected_category': category,
+            'breadcrumbs': breadcrumbs,
+            'q': q,
+            'sort': sort,
+            'min_price': price_param(request, 'min_price'),
+            'max_price': price_param(request, 'max_price'),
         })
 
 
 
+@method_decorator(conditional_get(product_detail_state), name='get')
 class ProductDetailView(View):
     def get(self, request, id):
-        obj = models.Product.objects.get(id=id)
-        return render(request, 'core/product_details.html', {'obj': obj})
+        obj = models.Product.objects.select_related('category').annotate(
+            approved_comment_count=Count('comments', filter=Q(comments__enable=True))
+        ).get(id=id)
+        comments = approved_comments(id).get_page(request.GET)
+        return render(request, 'core/product_details.html', {'obj': obj,
+                                                             'comments': comments,
+                                                             'breadcrumbs': obj.category.get_ancestors()})
 
     def post(self, request, id):
         product = models.Product.objects.get(id=id)
@@ -98,16 +198,31 @@ class ProductDetailView(View):
         return redirect("shop:product_detail", id=id)
 
 
+@method_decorator(conditional_get(product_detail_state), name='get')
+class ProductCommentsView(View):
+    """صفحه‌های بعدی نظرات تایید شده محصول (JSON) با cursor ?after="""
+    def get(self, request, id):
+        page = approved_comments(id).get_page(request.GET)
+        return JsonResponse({
+            'comments': [{
+                'user': c.user.username,
+                'text': c.text,
+                'created_at': date_format(localtime(c.created_at), 'Y/m/d H:i'),
+            } for c in page],
+            'next': page.next_query and f"{reverse('shop:product_comments', args=[id])}?{page.next_query}",
+        })
+
+
 class AddToCartView(View):
     def get(self, request, id):
         # if request.user.has_perm('core.can_buy'):
             obj = get_object_or_404(models.Product, id=id)
-            cart = get_cart(request)
-            add_to_cart(cart, obj)
-            request.session['cart'] = cart
+            store = CartStore.for_request(request, create=True)
+            if obj.available > 0 and obj.enabled:
+                store.add(obj)
 
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-               return JsonResponse(cart)
+               return JsonResponse(store.as_dict())
             return HttpResponseRedirect(reverse('shop:product_list'))
         # else:
         #     return HttpResponseForbidden()
@@ -115,39 +230,63 @@ class AddToCartView(View):
 
 class RemoveFromCartView(View):
     def get(self, request, id):
-        cart = get_cart(request)
-        remove_from_cart(cart, id)
-        request.session['cart'] = cart
+        store = CartStore.for_request(request)
+        store.remove(id)
 
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-           return JsonResponse({'total': get_cart_total_price(cart) ,
+           cart = store.as_dict()
+           return JsonResponse({'total': Cart(cart).total,
                                 'cart': cart})
         return HttpResponseRedirect(reverse('shop:product_list'))
 
 
 class EmptyCartView(View):
     def get(self, request,):
-        request.session['cart'] = {}
+        CartStore.for_request(request).clear()
 
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
            return JsonResponse({})
         return HttpResponseRedirect(reverse('shop:product_list'))
 
 
+class CartBatchView(View):
+    """
+    چند تغییر سبد در یک POST (JSON):
+    {"ops": [{"op": "add", "id": 3}, {"op": "set", "id": 5, "count": 2}, ...]}
+    پاسخ فقط ردیف‌های تغییر کرده (count=0 یعنی حذف) و جمع‌های جدید است.
+    """
+    def post(self, request):
+        try:
+            operations = json.loads(request.body)['ops']
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'body must be JSON like {"ops": [...]}'}, status=400)
+
+        store = CartStore.for_request(request, create=True)
+        try:
+            cart, changed, products = store.apply(operations)
+        except CartError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        totals = Cart(cart, products=products)
+        lines = {}
+        for pk in changed:
+            item = totals.items.get(str(pk))
+            lines[str(pk)] = {'count': item['count'], 'price': item['price']} if item else {'count': 0, 'price': 0}
+
+        return JsonResponse({
+            'lines': lines,
+            'count': len(totals),
+            'total': totals.total,
+            'vat': totals.vat,
+            'grand_total': totals.grand_total,
+        })
+
+
 class ShowCartView(View):
     def get(self, request):
-        cart = get_cart(request)
-        objects = models.Product.objects.filter(id__in=list(cart.keys()))
-        cart_objects = {}
-        for id, count in cart.items():
-            obj = objects.get(id=id)
-            cart_objects[id] = {
-                'obj': obj,
-                'count': count,
-                'price': obj.price * count * (1 - obj.discount / 100)
-            }
-        return render(request, 'core/cart.html', {'cart': cart_objects,
-                                                               'total':get_cart_total_price(cart)})
+        cart = Cart(get_cart(request))
+        return render(request, 'core/cart.html', {'cart': cart.items,
+                                                  'total': cart.total})
 
 
 # class CheckoutView(View):
@@ -214,180 +353,226 @@ class ShowCartView(View):
 #         return render(request, 'core/checkout.html', {'form': form})
 
 
-class CheckoutView(LoginRequiredMixin ,View):
-    def get(self, request):
-        form = forms.InvoiceForm()
+class AsyncLoginRequiredMixin:
+    """
+    معادل LoginRequiredMixin برای view های async: کاربر با request.auser() خوانده
+    می‌شود تا دسترسی به session/دیتابیس داخل event loop انجام نشود.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class CheckoutView(AsyncLoginRequiredMixin, View):
+    """
+    view async: بخش‌های ORM/قالب با sync_to_async اجرا می‌شوند و انتظار برای
+    زرین‌پال با کلاینت httpx روی event loop است، پس زیر ASGI پرداخت‌های در جریان
+    هیچ worker ای را اشغال نمی‌کنند.
+    """
+
+    async def get(self, request):
+        return await sync_to_async(self.render_checkout)(request)
+
+    def render_checkout(self, request):
+        form = forms.InvoiceForm(initial={'checkout_key': new_checkout_key()})
         cart = get_cart(request)
         if cart == {}:
             return render(request, 'core/empty_cart_error.html')
-        objects = models.Product.objects.filter(id__in=list(cart.keys()))
-        cart_objects = {}
-        for id, count in cart.items():
-            obj = objects.get(id=id)
-            cart_objects[id] = {
-                'obj': obj,
-                'count': count,
-                'price': obj.price * count * (1 - obj.discount / 100)
-            }
+        cart = Cart(cart)
         return render(request, 'core/checkout.html', {
             'form': form,
-            'total': get_cart_total_price(cart),
-            'cart': cart_objects
+            'total': cart.total,
+            'cart': cart.items
         })
 
-    def post(self, request):
+    async def post(self, request):
+        user = await request.auser()
+        key = request.POST.get('checkout_key', '')[:64]
+        # ارسال تکراری یک فرم: همان redirect قبلی، بدون فاکتور/Payment/درخواست درگاه جدید
+        if key and (url := await cached_result(user.pk, key)):
+            return redirect(url)
+
+        try:
+            result = await sync_to_async(self.create_payment)(request, key)
+        except DuplicateCheckout:
+            url = await wait_for_result(user.pk, key)
+            if url:
+                return redirect(url)
+            return HttpResponse('⏳ این سفارش قبلاً ارسال شده و در حال پردازش است؛ '
+                                'چند لحظه بعد دوباره تلاش کنید.', status=409)
+        if isinstance(result, HttpResponse):
+            return result
+        invoice, payment, payment_request, checkout = result
+
+        # ==========================
+        # 🔹 درخواست پرداخت از زرین‌پال (REST API)
+        # ==========================
+        gateway = get_async_gateway(request)
+        try:
+            data = await gateway.request_payment(**payment_request)
+        except GatewayError:
+            data = {'errors': {'message': 'درگاه پاسخ نداد، دوباره تلاش کنید.'}}
+
+        if data.get('data') and data['data'].get('code') == 100:
+            authority = data['data']['authority']
+            payment.authority = authority
+            await payment.asave()
+            url = gateway.start_pay_url(authority)
+            if checkout:
+                await sync_to_async(complete_checkout)(checkout, url)
+            return redirect(url)
+        else:
+            # پرداختی شروع نشد؛ موجودی رزرو شده همین حالا آزاد می‌شود
+            await sync_to_async(release_invoice)(invoice)
+            if checkout:
+                await sync_to_async(abandon_checkout)(checkout)
+            return HttpResponse(f"❌ خطا در اتصال به درگاه پرداخت: {data.get('errors', {}).get('message', '')}")
+
+    def create_payment(self, request, key=''):
+        """
+        بخش sync checkout: فاکتور، رزرو موجودی، کلید idempotency و Payment. خروجی یا یک
+        HttpResponse (فرم نامعتبر، سبد خالی، کمبود موجودی) است یا (invoice، payment،
+        پارامترهای درگاه، CheckoutKey). اگر key قبلاً ثبت شده باشد DuplicateCheckout.
+        """
+        if key and find_checkout(request.user.pk, key):
+            raise DuplicateCheckout(key)
+
         form = forms.InvoiceForm(request.POST)
-        if form.is_valid():
-            invoice = form.save(commit=False)
-            try:
-                invoice.user = request.user
-            except ValueError:
-                return redirect(reverse('login'))
-            cart = get_cart(request)
-            invoice.total = get_cart_total_price(cart)
-            invoice.save()
-
-            items = models.Product.objects.filter(id__in=list(cart.keys()))
-            item_objects = []
-            for item_id, item_count in cart.items():
-                obj = items.get(id=item_id)
-                invoice_item_obj = models.InvoiceItem(
-                    invoice=invoice,
-                    product=obj,
-                    count=item_count,
-                    discount=obj.discount,
-                    price=obj.price,
-                    name=obj.name,
-                    total=obj.price * item_count * (1 - obj.discount / 100)
-                )
-                item_objects.append(invoice_item_obj)
-            models.InvoiceItem.objects.bulk_create(item_objects)
-            request.session['cart'] = {}
-
-            payment = models.Payment(
-                total=invoice.total - invoice.total * invoice.discount + invoice.total * invoice.vat,
-                description='خرید از سایت ما',
-                user_ip=get_user_ip(request),
-                invoice=invoice
-            )
-            payment.save()
-
-            # ==========================
-            # 🔹 تنظیمات زرین‌پال Sandbox REST API
-            # ==========================
-            merchant_id = "XXXXXXXX-XXXX-XXXX-XXXX-XXXXXXXXXXXX"
-            # شناسه مرچنت sandbox
-            callback_url = "http://" + str(get_current_site(request).domain) + reverse('shop:verify')
-            phone = getattr(invoice.user, "phone", "")
-            mobile = ''.join(filter(str.isdigit, str(phone))) if phone else "0000000000"
-            email = str(getattr(invoice.user, "email", "noemail@example.com"))
-            req_data = {
-                "merchant_id": merchant_id,
-                "amount": round(payment.total),
-                "callback_url": callback_url,
-                "description": payment.description,
-                "metadata": {"email": str(invoice.user.email), "mobile": mobile}
-            }
-
-            res = requests.post(
-                url="https://sandbox.zarinpal.com/pg/v4/payment/request.json",
-                json=req_data,
-                headers={"accept": "application/json", "content-type": "application/json"}
-            )
+        if not form.is_valid():
+            return render(request, 'core/checkout.html', {'form': form})
 
-            data = res.json()
+        invoice = form.save(commit=False)
+        try:
+            invoice.user = request.user
+        except ValueError:
+            return redirect(reverse('login'))
+        cart = Cart(get_cart(request), vat=invoice.vat)
+        if not cart:
+            return render(request, 'core/empty_cart_error.html')
+        invoice.total = cart.total
+        # بیرون از تراکنش فاکتور تا رزرو بازه شماره‌ها قفل شمارنده را طولانی نگه ندارد
+        invoice.number = next_invoice_number()
 
-            if data.get('data') and data['data'].get('code') == 100:
-                authority = data['data']['authority']
-                payment.authority = authority
-                payment.save()
-                return redirect(f"https://sandbox.zarinpal.com/pg/StartPay/{authority}")
-            else:
+        # فاکتور و رزرو موجودی در یک تراکنش: کمبود موجودی یعنی هیچ فاکتوری ساخته نمی‌شود
+        try:
+            with transaction.atomic():
+                invoice.save()
+                checkout = None
+                if key:
+                    try:
+                        with transaction.atomic():
+                            checkout = claim_checkout(request.user, key, invoice)
+                    except IntegrityError:
+                        # درخواست هم‌زمان دیگری با همین فرم زودتر ثبت شد
+                        raise DuplicateCheckout(key)
+                models.InvoiceItem.objects.bulk_create(cart.invoice_items(invoice))
+                reserve_stock(invoice, {item['obj']: item['count'] for item in cart.items.values()})
+        except OutOfStock as e:
+            form.add_error(None, f'موجودی «{e.product.name}» کافی نیست.')
+            return render(request, 'core/checkout.html', {
+                'form': form,
+                'total': cart.total,
+                'cart': cart.items
+            })
+        CartStore.for_request(request).clear()
 
-                return HttpResponse(f"❌ خطا در اتصال به درگاه پرداخت: {data.get('errors', {}).get('message', '')}")
+        payment = models.Payment(
+            total=cart.grand_total - to_money(invoice.total * invoice.discount),
+            description='خرید از سایت ما',
+            user_ip=get_user_ip(request),
+            invoice=invoice
+        )
+        payment.save()
 
-        return render(request, 'core/checkout.html', {'form': form})
+        phone = getattr(invoice.user, "phone", "")
+        mobile = ''.join(filter(str.isdigit, str(phone))) if phone else "0000000000"
+        return invoice, payment, {
+            'amount': round(payment.total),
+            'callback_url': "http://" + str(get_current_site(request).domain) + reverse('shop:verify'),
+            'description': payment.description,
+            'metadata': {"email": str(invoice.user.email), "mobile": mobile},
+        }, checkout
 
 
 
 
-class VerifyView(LoginRequiredMixin ,View):
-    def get(self, request):
+class VerifyView(AsyncLoginRequiredMixin, View):
+    async def get(self, request):
+        user = await request.auser()
         status = request.GET.get('Status')
         authority = request.GET.get('Authority')
+        # فقط پرداخت‌های همین کاربر؛ authority از query string است و قابل حدس/دستکاری
+        payments = models.Payment.objects.filter(
+            authority=authority, invoice__user_id=user.pk, status=models.Payment.STATUS_PENDING)
 
-        
         if status != 'OK':
-            return render(request, 'core/payment_failed.html', {
+            # پرداخت لغو شد؛ موجودی رزرو شده همین حالا آزاد می‌شود (نه بعد از TTL)
+            await sync_to_async(release_reservations)(models.StockReservation.objects.filter(
+                invoice__payment__in=payments,
+            ))
+            return await sync_to_async(render)(request, 'core/payment_failed.html', {
                 'error': 'پرداخت لغو شد یا کاربر منصرف شد.'
             })
 
         try:
-            payment = models.Payment.objects.get(
-                authority=authority,
-                status=models.Payment.STATUS_PENDING
-            )
+            payment = await payments.select_related('invoice').aget()
         except models.Payment.DoesNotExist:
-            return render(request, 'core/payment_failed.html', {
+            return await sync_to_async(render)(request, 'core/payment_failed.html', {
                 'error': 'تراکنش یافت نشد.'
             })
 
         # ==========================
         # 🔹 مرحله تایید پرداخت (REST API)
         # ==========================
-        merchant_id = "XXXXXXXX-XXXX-XXXX-XXXX-XXXXXXXXXXXX"  # ← مرچنت آی‌دی خودت
-        verify_url = "https://sandbox.zarinpal.com/pg/v4/payment/verify.json"
-
-        req_data = {
-            "merchant_id": merchant_id,
-            "amount": round(payment.total),
-            "authority": authority
-        }
+        try:
+            data = await get_async_gateway(request).verify(amount=round(payment.total), authority=authority)
+        except GatewayError as e:
+            return await sync_to_async(self.gateway_failed)(request, payment, e)
+        return await sync_to_async(self.finish_payment)(request, payment, data)
 
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json"
-        }
+    def gateway_failed(self, request, payment, error):
+        # خطای موقت (timeout/شبکه) یعنی نتیجه پرداخت معلوم نیست؛ Payment در pending
+        # می‌ماند تا reconcile_payments یا مراجعه دوباره کاربر آن را تعیین وضعیت کند
+        return self.payment_pending(request)
 
-        try:
-            res = requests.post(verify_url, json=req_data, headers=headers)
-            data = res.json()
-        except Exception as e:
-            payment.status = models.Payment.STATUS_ERROR
-            payment.save()
-            return render(request, 'core/payment_failed.html', {
-                'error': f'خطا در ارتباط با زرین‌پال: {e}'
-            })
+    def payment_pending(self, request):
+        return render(request, 'core/payment_pending.html', status=202)
 
+    def finish_payment(self, request, payment, data):
+        """بخش sync بعد از پاسخ درگاه: وضعیت Payment، موجودی و رندر نتیجه"""
         # ==========================
         # 🔹 بررسی پاسخ زرین‌پال
         # ==========================
-        result = data.get('data', {})
+        result = data.get('data') or {}
         code = result.get('code')
 
         if code == 100:
             # ✅ پرداخت موفق
             ref_id = str(result.get('ref_id'))
-            payment.ref = ref_id
-            payment.status = models.Payment.STATUS_DONE
-            payment.save()
+            finalize_payment(payment, models.Payment.STATUS_DONE, ref_id)
             return render(request, 'core/payment_done.html', {'refid': ref_id})
 
         elif code == 101:
-            # ⚠️ پرداخت قبلاً تایید شده
-            payment.status = models.Payment.STATUS_DONE
-            payment.save()
+            # ⚠️ پرداخت قبلاً تایید شده (مثلاً توسط reconcile_payments)
+            finalize_payment(payment, models.Payment.STATUS_DONE)
+            payment.refresh_from_db(fields=['ref'])
             return render(request, 'core/payment_done.html', {
                 'refid': payment.ref,
                 'message': 'این تراکنش قبلاً تایید شده بود.'
             })
 
-        else:
-            # ❌ پرداخت ناموفق
-            payment.status = models.Payment.STATUS_ERROR
-            payment.save()
-            error_msg = data.get('errors', {}).get('message', 'پرداخت ناموفق بود.')
-            return render(request, 'core/payment_failed.html', {'error': error_msg})
+        errors = data.get('errors') or {}
+        if not isinstance(errors, dict) or errors.get('code') not in FAILED_CODES:
+            # ⏳ جواب قطعی نیست (مثل verify_outcome در reconciliation)؛ pending می‌ماند
+            return self.payment_pending(request)
+
+        # ❌ پرداخت ناموفق
+        finalize_payment(payment, models.Payment.STATUS_ERROR)
+        error_msg = errors.get('message', 'پرداخت ناموفق بود.')
+        return render(request, 'core/payment_failed.html', {'error': error_msg})
 
 
 # class VerifyView(View):
@@ -427,26 +612,17 @@ def get_user_ip(request):
 
 
 
-def decrease_from_cart(cart, obj):
-    id = str(obj.id)
-    if id in cart:
-        if cart[id] > 1:
-            cart[id] -= 1
-        else:
-            del cart[id]
-
-
 class DecreaseFromCartView(View):
     def get(self, request, id):
         obj = get_object_or_404(models.Product, id=id)
-        cart = get_cart(request)
+        store = CartStore.for_request(request)
 
-        decrease_from_cart(cart, obj)
-        request.session['cart'] = cart
+        store.decrease(obj.id)
+        cart = store.as_dict()
 
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
             return JsonResponse({
-                'total': get_cart_total_price(cart),
+                'total': Cart(cart).total,
                 'cart': cart
             })
 